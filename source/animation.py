@@ -0,0 +1,65 @@
+class Animation:
+    """ Общая таблица кадров: один список картинок и интервал на всех, кто её играет """
+
+    def __init__(self, frames, interval):
+        self.frames = frames
+        self.interval = interval
+
+    def __len__(self):
+        return len(self.frames)
+
+
+class AnimationState:
+    """ Текущий кадр анимации; кадр сменяется, когда с прошлой смены прошло больше interval """
+
+    def __init__(self, animation, now=0):
+        self.animation = animation
+        self.index = 0
+        self.timer = now
+        self.image = animation.frames[0]
+
+    def advance(self, now):
+        """ Перейти на следующий кадр, если пора; вернуть True, если кадр сменился """
+        if now - self.timer <= self.animation.interval:
+            return False
+        self.index = (self.index + 1) % len(self.animation)
+        self.image = self.animation.frames[self.index]
+        self.timer = now
+        return True
+
+    def seek(self, index, timer):
+        self.index = index
+        self.image = self.animation.frames[index]
+        self.timer = timer
+
+
+class AnimationClock:
+    """ Один тик на все фазово-синхронные группы: кадр группы считается раз за тик, а не на каждый спрайт """
+
+    def __init__(self):
+        self.groups = {}
+        self.changes = 0
+
+    def group(self, name, animation, now=0):
+        """ Общее состояние группы name; спрайты группы берут картинку из него """
+        state = self.groups.get(name)
+        if state is None:
+            state = self.groups[name] = AnimationState(animation, now)
+        return state
+
+    def tick(self, now):
+        for state in self.groups.values():
+            self.changes += state.advance(now)
+
+    def retime(self, now):
+        for state in self.groups.values():
+            state.timer = now
+
+    def phases(self, now):
+        """ {группа: (кадр, возраст кадра)} для снимка мира """
+        return {name: (state.index, now - state.timer) for name, state in self.groups.items()}
+
+    def restore(self, phases, now):
+        for name, (index, age) in phases.items():
+            if name in self.groups:
+                self.groups[name].seek(index, now - age)
@@ -0,0 +1,123 @@
+import hashlib
+import threading
+
+import pygame as pg
+
+from atlas import TextureAtlas
+
+
+class AssetCache:
+    """ Общий на процесс кэш картинок: лист читается с диска один раз, кадры отдаются готовыми;
+    кадры итогового размера и тайлы уровней складываются в атлас, если он задан. Атлас место не освобождает,
+    поэтому кадры живут до конца процесса, а память растёт только с числом разных картинок """
+
+    def __init__(self, atlas=None):
+        self.atlas = atlas
+        self.sheets = {}
+        self.frames = {}
+        self.tiles = {}
+        self.masks = {}
+        # Уровни собираются и в потоке загрузчика: кэш и атлас меняются только под замком
+        self.lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+    def sheet(self, path):
+        if path not in self.sheets:
+            image = pg.image.load(path)
+            self.loads += 1
+            if pg.display.get_surface() is not None:
+                image = image.convert_alpha()
+            self.sheets[path] = image
+        return self.sheets[path]
+
+    def frame(self, path, rect=None, size=None, flip=False):
+        """ Кадр листа path: вырезать rect, растянуть до size, отразить по горизонтали при flip """
+        key = (path, tuple(rect) if rect else None, tuple(size) if size else None, flip)
+        with self.lock:
+            image = self.frames.get(key)
+            if image is not None:
+                self.hits += 1
+                return image
+
+            self.misses += 1
+            image = self.sheet(path)
+            if rect:
+                image = image.subsurface(rect)
+            if size:
+                image = pg.transform.scale(image, size)
+            if flip:
+                image = pg.transform.flip(image, True, False)
+            if size or flip:
+                packed = self.pack(image)
+                if packed is not image:
+                    # mask.from_surface и transform.* над подповерхностью блокируют всю страницу атласа, и блит
+                    # из неё в потоке отрисовки падает. Поэтому отражение и маска делаются с копии до упаковки
+                    self.masks[packed] = pg.mask.from_surface(image)
+                image = packed
+            self.frames[key] = image
+            return image
+
+    def tile(self, pixels):
+        """ Тайл из RGBA-массива (высота, ширина, 4); одинаковые пиксели любого уровня дают одну картинку атласа """
+        key = (pixels.shape, hashlib.sha1(pixels.tobytes()).digest())
+        with self.lock:
+            image = self.tiles.get(key)
+            if image is None:
+                image = pg.image.frombuffer(pixels.tobytes(), (pixels.shape[1], pixels.shape[0]), "RGBA")
+                image = self.tiles[key] = self.pack(image)
+            return image
+
+    def pack(self, image):
+        return self.atlas.pack(image) if self.atlas is not None else image
+
+    def source(self, image):
+        """ (поверхность, область) для блита кадра: страница атласа или сам кадр """
+        return self.atlas.source(image) if self.atlas is not None else (image, None)
+
+    def mask(self, image):
+        """ Маска кадра, посчитанная один раз на поверхность """
+        mask = self.masks.get(image)
+        if mask is None:
+            with self.lock:
+                mask = self.masks.get(image)
+                if mask is None:
+                    mask = self.masks[image] = pg.mask.from_surface(image)
+        return mask
+
+    def strip(self, path, count, tile_width, tile_height, size=None, flip=False):
+        return [self.frame(path, (i * tile_width, 0, tile_width, tile_height), size, flip) for i in range(count)]
+
+    def stats(self):
+        stats = {"hits": self.hits, "misses": self.misses, "loads": self.loads,
+                 "sheets": len(self.sheets), "frames": len(self.frames), "tiles": len(self.tiles),
+                 "masks": len(self.masks)}
+        if self.atlas is not None:
+            stats["atlas"] = self.atlas.stats()
+        return stats
+
+    def clear(self):
+        self.sheets.clear()
+        self.frames.clear()
+        self.tiles.clear()
+        self.masks.clear()
+
+
+assets = AssetCache(atlas=TextureAtlas())
+
+
+def tmx_image_loader(filename, colorkey, **kwargs):
+    """ Загрузчик тайлов для pytmx.TiledMap через общий кэш; работает и без окна """
+    from pytmx.util_pygame import handle_transformation
+
+    def load(rect=None, flags=None):
+        tile = assets.frame(filename, rect)
+        if flags:
+            tile = handle_transformation(tile, flags)
+        if colorkey:
+            tile = tile.copy()
+            tile.set_colorkey(colorkey, pg.RLEACCEL)
+        return tile
+
+    return load
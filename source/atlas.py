@@ -0,0 +1,78 @@
+import threading
+
+import pygame as pg
+
+ATLAS_PAGE_SIZE = 1024
+ATLAS_PADDING = 1
+
+
+class TextureAtlas:
+    """ Кадры, упакованные полками в несколько больших страниц; каждый кадр — подповерхность страницы """
+
+    def __init__(self, page_size=ATLAS_PAGE_SIZE, padding=ATLAS_PADDING):
+        self.page_size = page_size
+        self.padding = padding
+        self.pages = []
+        self.shelves = []
+        self.locations = {}
+        # Место на полке выдаётся и заполняется под замком: паковать могут главный поток и загрузчик уровней.
+        # Поток отрисовки блитует из страниц без этого замка, поэтому кадры атласа нельзя передавать в
+        # mask.from_surface, transform.* и прочее, что блокирует поверхность: это заблокирует всю страницу и
+        # блит в потоке отрисовки упадёт. Маски кадров AssetCache строит заранее, с копий до упаковки
+        self.lock = threading.Lock()
+
+    def new_page(self):
+        page = pg.Surface((self.page_size, self.page_size), pg.SRCALPHA)
+        if pg.display.get_surface() is not None:
+            page = page.convert_alpha()
+        page.fill((0, 0, 0, 0))
+        self.pages.append(page)
+        self.shelves.append([])
+        return len(self.pages) - 1
+
+    def allocate(self, width, height):
+        """ Место под кадр: первая полка подходящей высоты, иначе новая полка, иначе новая страница """
+        for index, shelves in enumerate(self.shelves):
+            for shelf in shelves:
+                top, shelf_height, x = shelf
+                if height <= shelf_height and x + width <= self.page_size:
+                    shelf[2] = x + width + self.padding
+                    return index, x, top
+            top = shelves[-1][0] + shelves[-1][1] + self.padding if shelves else 0
+            if top + height <= self.page_size:
+                shelves.append([top, height, width + self.padding])
+                return index, 0, top
+        index = self.new_page()
+        self.shelves[index].append([0, height, width + self.padding])
+        return index, 0, 0
+
+    def pack(self, image):
+        """ Скопировать кадр в атлас и вернуть его подповерхность; слишком большие кадры остаются как есть """
+        width, height = image.get_size()
+        if image in self.locations or width > self.page_size or height > self.page_size:
+            return image
+        with self.lock:
+            return self.place(image, width, height)
+
+    def place(self, image, width, height):
+        index, x, y = self.allocate(width, height)
+        page = self.pages[index]
+        if image.get_colorkey() is not None or not image.get_flags() & pg.SRCALPHA:
+            # Спецфлаги блита не знают про colorkey: сначала переводим его в прозрачность обычным блитом
+            source = pg.Surface((width, height), pg.SRCALPHA)
+            source.fill((0, 0, 0, 0))
+            source.blit(image, (0, 0))
+            image = source
+        # Область страницы прозрачна, поэтому MAX по всем каналам копирует пиксели без смешивания
+        page.blit(image, (x, y), special_flags=pg.BLEND_RGBA_MAX)
+        frame = page.subsurface((x, y, width, height))
+        self.locations[frame] = (page, pg.Rect(x, y, width, height))
+        return frame
+
+    def source(self, image):
+        """ (страница, область) для блита кадра; кадр не из атласа рисуется целиком """
+        return self.locations.get(image, (image, None))
+
+    def stats(self):
+        return {"pages": len(self.pages), "frames": len(self.locations),
+                "bytes": sum(page.get_bytesize() * self.page_size * self.page_size for page in self.pages)}
@@ -0,0 +1,169 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+CALLER_DIR = os.getcwd()
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+import levelcache
+import platformer_beta as game
+
+MAX_TICKS = 3600
+
+
+def script_right(tick, rng):
+    return game.Inputs(right=True, jump=tick % 45 == 0, fire=tick % 40 == 0)
+
+
+def script_zigzag(tick, rng):
+    return game.Inputs(right=(tick // 120) % 4 != 3, left=(tick // 120) % 4 == 3,
+                       jump=tick % 50 == 0, fire=tick % 40 == 0)
+
+
+def script_random(tick, rng):
+    return game.Inputs(right=rng.random() < 0.7, left=rng.random() < 0.2,
+                       jump=rng.random() < 0.05, fire=rng.random() < 0.03)
+
+
+SCRIPTS = {
+    "right": script_right,
+    "zigzag": script_zigzag,
+    "random": script_random,
+}
+
+
+def init_worker(map_dir, levels):
+    """ Загрузить уровни один раз на процесс; дальше сессии берут их из памяти """
+    levelcache.KEEP_LOADED = True
+    for level in levels:
+        levelcache.load_level_data(map_dir, level, game.TILE_SCALE)
+
+
+def run_session(map_dir, level, script, seed, max_ticks):
+    """ Одна партия бота без окна: до портала, проигрыша или max_ticks """
+    started = time.perf_counter()
+    simulation = game.Simulation(level=level, map_dir=map_dir, advance=False)
+    load_time = time.perf_counter() - started
+    coins_amount = simulation.coins_amount
+    inputs = SCRIPTS[script]
+    rng = random.Random(seed)
+
+    started = time.perf_counter()
+    for tick in range(max_ticks):
+        simulation.step(inputs(tick, rng))
+        if simulation.mode != "game":
+            break
+    total = time.perf_counter() - started
+
+    completed = simulation.mode == "completed"
+    return {
+        "level": level,
+        "script": script,
+        "seed": seed,
+        "completed": completed,
+        "game_over": simulation.mode == "game over",
+        "coins": simulation.allcoll_coins,
+        "coins_amount": coins_amount,
+        "ticks": simulation.ticks,
+        "hp": simulation.player.hp,
+        "level_load_ms": round(load_time * 1000, 3),
+        "seconds": round(total, 4),
+    }
+
+
+def run_chunk(sessions):
+    return [run_session(*session) for session in sessions]
+
+
+def summarize(results):
+    levels = {}
+    for result in results:
+        summary = levels.setdefault(result["level"], {
+            "sessions": 0, "completed": 0, "game_over": 0, "coins_amount": result["coins_amount"],
+            "best_coins": 0, "ticks": 0, "fastest_completion": None})
+        summary["sessions"] += 1
+        summary["completed"] += result["completed"]
+        summary["game_over"] += result["game_over"]
+        summary["best_coins"] = max(summary["best_coins"], result["coins"])
+        summary["ticks"] += result["ticks"]
+        if result["completed"] and (summary["fastest_completion"] is None
+                                    or result["ticks"] < summary["fastest_completion"]):
+            summary["fastest_completion"] = result["ticks"]
+    for summary in levels.values():
+        summary["half_coins_reachable"] = summary["best_coins"] > summary["coins_amount"] / 2
+        summary["completion_rate"] = round(summary["completed"] / summary["sessions"], 3)
+        summary["mean_ticks"] = round(summary.pop("ticks") / summary["sessions"], 1)
+    return {str(level): levels[level] for level in sorted(levels)}
+
+
+def run_batch(map_dir, levels, scripts, seeds, max_ticks=MAX_TICKS, workers=None, chunk_size=4):
+    """ Разложить партии (уровень x скрипт x сид) по процессам и собрать общий отчёт """
+    workers = workers or os.cpu_count() or 1
+    sessions = [(map_dir, level, script, seed, max_ticks)
+                for level in levels for script in scripts for seed in seeds]
+    chunks = [sessions[i:i + chunk_size] for i in range(0, len(sessions), chunk_size)]
+
+    started = time.perf_counter()
+    if workers == 1:
+        init_worker(map_dir, levels)
+        results = [result for chunk in chunks for result in run_chunk(chunk)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(map_dir, levels)) as executor:
+            results = [result for chunk in executor.map(run_chunk, chunks) for result in chunk]
+    total = time.perf_counter() - started
+
+    ticks = sum(result["ticks"] for result in results)
+    return {
+        "workers": workers,
+        "sessions": len(results),
+        "seconds": round(total, 3),
+        "sessions_per_sec": round(len(results) / total, 2),
+        "ticks_per_sec": round(ticks / total, 2),
+        "session_seconds": round(sum(result["seconds"] for result in results), 3),
+        "levels": summarize(results),
+        "results": results,
+    }
+
+
+def parse_list(text):
+    return [int(value) for value in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пакетный прогон ботов по уровням на всех ядрах")
+    parser.add_argument("--map-dir", default=None, help="каталог с картами вместо Resources/map")
+    parser.add_argument("--levels", default="1,2,3", help="номера уровней через запятую")
+    parser.add_argument("--scripts", default=",".join(SCRIPTS), help="скрипты ввода: " + ", ".join(SCRIPTS))
+    parser.add_argument("--seeds", type=int, default=8, help="сколько сидов на пару уровень-скрипт")
+    parser.add_argument("--max-ticks", type=int, default=MAX_TICKS)
+    parser.add_argument("--workers", type=int, default=None, help="процессов, по умолчанию по числу ядер")
+    parser.add_argument("--output", help="файл для JSON-отчёта, по умолчанию stdout")
+    args = parser.parse_args()
+
+    scripts = args.scripts.split(",")
+    for script in scripts:
+        if script not in SCRIPTS:
+            parser.error(f"unknown script {script}")
+    map_dir = os.path.join(CALLER_DIR, args.map_dir) if args.map_dir else game.resource_path("Resources/map")
+    report = run_batch(map_dir, parse_list(args.levels), scripts, range(args.seeds),
+                       args.max_ticks, args.workers)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(os.path.join(CALLER_DIR, args.output), "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if any(not summary["completed"] for summary in report["levels"].values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
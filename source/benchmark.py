@@ -0,0 +1,230 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+CALLER_DIR = os.getcwd()
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+import platformer_beta as game
+from profiler import profiler
+
+GRASS = 9
+DIRT = 26
+COIN = 78
+PORTAL = 180
+MAP_DIR = os.path.abspath("Resources/map")
+
+
+def csv_layer(layer_id, name, rows):
+    width = len(rows[0])
+    data = ",\n".join(",".join(str(gid) for gid in row) for row in rows)
+    return (f' <layer id="{layer_id}" name="{name}" width="{width}" height="{len(rows)}">\n'
+            f'  <data encoding="csv">\n{data}\n</data>\n </layer>\n')
+
+
+def generate_level(directory, width, height, enemies, seed=0, level=1):
+    """ Синтетический уровень width x height тайлов: пол, уступы, монеты, портал и enemies врагов """
+    rng = random.Random(seed)
+    ground = [[0] * width for _ in range(height)]
+    coins = [[0] * width for _ in range(height)]
+    portal = [[0] * width for _ in range(height)]
+    collision = [[0] * width for _ in range(height)]
+
+    for x in range(width):
+        ground[height - 2][x] = GRASS
+        ground[height - 1][x] = DIRT
+    for x in range(8, width - 8, 12):
+        ledge_y = height - rng.randint(5, 8)
+        for dx in range(4):
+            ground[ledge_y][x + dx] = GRASS
+        coins[ledge_y - 1][x + 1] = COIN
+        coins[height - 3][x + 6] = COIN
+    portal[height - 3][width - 4] = PORTAL
+
+    tilesets = "".join(
+        f' <tileset firstgid="{firstgid}" source="{os.path.join(MAP_DIR, source)}"/>\n'
+        for firstgid, source in ((1, "nature-paltformer-tileset-16x16.tsx"), (78, "Coins.tsx"),
+                                 (83, "greenportalspritesheet.tsx")))
+    tmx = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+           f'<map version="1.10" orientation="orthogonal" renderorder="right-down" width="{width}" '
+           f'height="{height}" tilewidth="16" tileheight="16" infinite="0" nextlayerid="5" nextobjectid="1">\n'
+           + tilesets
+           + csv_layer(1, "Game", ground) + csv_layer(2, "Collision", collision)
+           + csv_layer(3, "Coins", coins) + csv_layer(4, "Portal", portal)
+           + '</map>\n')
+    with open(os.path.join(directory, f"level{level}.tmx"), "w", encoding="utf-8") as f:
+        f.write(tmx)
+
+    patrols = []
+    for i in range(enemies):
+        x = rng.randrange(2, max(3, width - 6))
+        patrols.append({"name": "Cheese" if i % 2 else "Redic",
+                        "start_pos": [x, height - 2], "final_pos": [x + rng.randint(1, 4), height - 2]})
+    with open(os.path.join(directory, f"level{level}_enemies.json"), "w", encoding="utf-8") as f:
+        json.dump({"enemies": patrols}, f)
+
+
+def scripted_inputs(tick):
+    return game.Inputs(right=(tick // 120) % 4 != 3, left=(tick // 120) % 4 == 3,
+                       jump=tick % 50 == 0, fire=tick % 40 == 0)
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def peak_rss_kb():
+    """ Пиковая память процесса в КБ; None, если платформа её не сообщает """
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class MemoryCounters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                    "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+
+        counters = MemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return None
+        return counters.PeakWorkingSetSize // 1024
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS отдаёт байты, Linux — килобайты
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def run_case(width, height, enemies, ticks, draw, seed, pipeline=False):
+    with tempfile.TemporaryDirectory() as directory:
+        generate_level(directory, width, height, enemies, seed)
+
+        started = time.perf_counter()
+        simulation = game.Simulation(map_dir=directory)
+        frontend = game.Game(simulation, pipeline=pipeline) if draw else None
+        load_time = time.perf_counter() - started
+
+        frame_times = []
+        profiler.reset()
+        started = time.perf_counter()
+        for tick in range(ticks):
+            profiler.begin_frame()
+            frame_started = time.perf_counter()
+            if frontend:
+                frontend.update(scripted_inputs(tick))
+                frontend.draw()
+            else:
+                simulation.step(scripted_inputs(tick))
+            frame_times.append(time.perf_counter() - frame_started)
+            if frontend and profiler.enabled:
+                frontend.count_frame()
+            profiler.end_frame()
+        if frontend:
+            frontend.close()
+        total = time.perf_counter() - started
+
+    case = {
+        "width": width,
+        "height": height,
+        "enemies": enemies,
+        "ticks": ticks,
+        "draw": draw,
+        "stream": game.STREAM_LEVELS,
+        "pipeline": pipeline and draw,
+        "level_load_ms": round(load_time * 1000, 3),
+        "ticks_per_sec": round(ticks / total, 2),
+        "frame_ms_p50": round(percentile(frame_times, 0.5) * 1000, 3),
+        "frame_ms_p99": round(percentile(frame_times, 0.99) * 1000, 3),
+        "peak_rss_kb": peak_rss_kb(),
+    }
+    if profiler.enabled:
+        case["profile"] = profiler.summary()
+    return case
+
+
+def run_isolated(args, size, enemies):
+    """ Один случай в отдельном процессе: пиковая память и прогретые кэши не тянутся из прошлых случаев """
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, "case.json")
+        command = [sys.executable, os.path.abspath(__file__), "--in-process", "--sizes", size, "--enemies", enemies,
+                   "--ticks", str(args.ticks), "--seed", str(args.seed), "--output", output]
+        for flag, enabled in (("--no-draw", args.no_draw), ("--stream", args.stream),
+                              ("--pipeline", args.pipeline), ("--profile", args.profile)):
+            if enabled:
+                command.append(flag)
+        subprocess.run(command, check=True)
+        with open(output, encoding="utf-8") as f:
+            return json.load(f)["cases"][0]
+
+
+def commit_hash():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def parse_size(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк Simulation/Game на синтетических уровнях")
+    parser.add_argument("--sizes", default="40x20,1000x50,5000x200",
+                        help="размеры карт в тайлах через запятую, например 40x20,5000x200")
+    parser.add_argument("--enemies", default="2,100,1000", help="количества врагов через запятую")
+    parser.add_argument("--ticks", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-draw", action="store_true", help="мерить только Simulation.step")
+    parser.add_argument("--stream", action="store_true", help="грузить уровни чанками вокруг игрока")
+    parser.add_argument("--pipeline", action="store_true", help="рисовать кадры в отдельном потоке")
+    parser.add_argument("--profile", action="store_true", help="добавить в отчёт p50/p99 по фазам кадра")
+    parser.add_argument("--output", help="файл для JSON-отчёта, по умолчанию stdout")
+    parser.add_argument("--in-process", action="store_true",
+                        help="гонять все случаи в этом процессе, а не каждый в своём")
+    args = parser.parse_args()
+    game.STREAM_LEVELS = args.stream
+    profiler.enabled = profiler.enabled or args.profile
+
+    cases = []
+    for size in args.sizes.split(","):
+        width, height = parse_size(size)
+        for enemies in args.enemies.split(","):
+            if args.in_process:
+                cases.append(run_case(width, height, int(enemies), args.ticks, not args.no_draw, args.seed,
+                                      args.pipeline))
+            else:
+                cases.append(run_isolated(args, size, enemies))
+
+    report = {
+        "commit": commit_hash(),
+        "python": sys.version.split()[0],
+        "pygame": game.pg.version.ver,
+        "cases": cases,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(os.path.join(CALLER_DIR, args.output), "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
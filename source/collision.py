@@ -0,0 +1,159 @@
+import numpy as np
+import pygame as pg
+
+
+class Step:
+    """ Шаг симуляции длиной scale тиков 60 Гц: переводит скорости и ускорения «на тик» в целые пиксели за шаг.
+    Округляется путь от начала игры (tick), поэтому дробные пиксели не теряются от шага к шагу.
+    При scale == 1 значения не меняются, и игра на 60 Гц считается как раньше """
+
+    def __init__(self, scale=1, tick=0):
+        self.scale = scale
+        self.tick = tick
+
+    def __call__(self, value):
+        if self.scale == 1:
+            return value
+        start = value * self.scale * self.tick
+        end = start + value * self.scale
+        if isinstance(value, np.ndarray):
+            return (np.rint(end) - np.rint(start)).astype(np.int64)
+        return int(round(end) - round(start))
+
+    def moved(self, velocity, acceleration):
+        """ Путь за шаг при скорости, уже набравшей acceleration за этот шаг: столько же, сколько прошли бы тики
+        60 Гц по одному, а не velocity * scale, которое на длинном шаге перелетает """
+        if self.scale == 1:
+            return velocity
+        return self(velocity - acceleration * (self.scale - 1) / 2)
+
+
+UNIT_STEP = Step()
+
+
+class MaskTester:
+    """ Попиксельная проверка с дешёвым отсевом по прямоугольникам и счётчиками проверок;
+    candidates — сколько врагов сетка роя отдала на проверку прямоугольников, до отсева """
+
+    def __init__(self):
+        self.candidates = 0
+        self.broadphase = 0
+        self.narrowphase = 0
+
+    def reset(self):
+        self.candidates = 0
+        self.broadphase = 0
+        self.narrowphase = 0
+
+    def __call__(self, left, right):
+        self.broadphase += 1
+        if not left.rect.colliderect(right.rect):
+            return False
+        self.narrowphase += 1
+        return pg.sprite.collide_mask(left, right) is not None
+
+
+def merge_rects(gids):
+    """ Склеить занятые клетки в прямоугольники (x, y, w, h) в тайлах: отрезки строк, продлённые вниз,
+    пока в следующей строке есть такой же отрезок """
+    height, width = gids.shape
+    row = np.zeros(width + 2, dtype=np.int8)
+    rects = []
+    open_runs = {}
+    for y in range(height):
+        row[1:-1] = gids[y] != 0
+        edges = np.flatnonzero(np.diff(row)).tolist()
+        runs = set(zip(edges[::2], edges[1::2]))
+        for run in open_runs.keys() - runs:
+            rects.append(open_runs.pop(run))
+        for start, end in runs:
+            if (start, end) in open_runs:
+                open_runs[(start, end)][3] += 1
+            else:
+                open_runs[(start, end)] = [start, y, end - start, 1]
+    rects.extend(open_runs.values())
+    rects.sort(key=lambda rect: (rect[1], rect[0]))
+    return np.array(rects, dtype=np.int32).reshape(-1, 4)
+
+
+def rect_ids(rects, width, height):
+    """ Сетка номеров склеенных прямоугольников: 0 — пусто, i + 1 — rects[i] """
+    ids = np.zeros((height, width), dtype=np.int32)
+    for i, (x, y, w, h) in enumerate(rects.tolist()):
+        ids[y:y + h, x:x + w] = i + 1
+    return ids
+
+
+class TileGrid:
+    """ Плотная сетка тайлов слоя "Game": gid каждой клетки в массиве NumPy; сталкиваемся со склеенными
+    прямоугольниками, а не с каждым тайлом """
+
+    def __init__(self, width, height, tile_width, tile_height, gids=None, rects=None, ids=None):
+        self.width = width
+        self.height = height
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+        self.gids = np.zeros((height, width), dtype=np.uint32) if gids is None else gids
+        self.rects = rects
+        self.ids = ids
+        if self.rects is None or self.ids is None:
+            self.merge()
+
+    def merge(self):
+        self.rects = merge_rects(self.gids)
+        self.ids = rect_ids(self.rects, self.width, self.height)
+
+    def cell_range(self, rect):
+        x0 = max(0, rect.left // self.tile_width)
+        y0 = max(0, rect.top // self.tile_height)
+        x1 = min(self.width - 1, (rect.right - 1) // self.tile_width)
+        y1 = min(self.height - 1, (rect.bottom - 1) // self.tile_height)
+        return x0, y0, x1, y1
+
+    def overlapping(self, rect):
+        """ Склеенные прямоугольники под rect в пикселях, сверху вниз и слева направо """
+        x0, y0, x1, y1 = self.cell_range(rect)
+        if x0 > x1 or y0 > y1:
+            return []
+        ids = self.ids[y0:y1 + 1, x0:x1 + 1]
+        return [pg.Rect(x * self.tile_width, y * self.tile_height, w * self.tile_width, h * self.tile_height)
+                for x, y, w, h in self.rects[np.unique(ids[ids > 0]) - 1].tolist()]
+
+    def collides(self, rect):
+        x0, y0, x1, y1 = self.cell_range(rect)
+        if x0 > x1 or y0 > y1:
+            return False
+        return bool(self.gids[y0:y1 + 1, x0:x1 + 1].any())
+
+    def collide_x(self, sprite):
+        for tile in self.overlapping(sprite.rect):
+            if sprite.rect.colliderect(tile):
+                if sprite.velocity_x > 0:
+                    sprite.rect.right = tile.left
+                elif sprite.velocity_x < 0:
+                    sprite.rect.left = tile.right
+
+    def collide_y(self, sprite):
+        for tile in self.overlapping(sprite.rect):
+            if sprite.rect.colliderect(tile):
+                if sprite.velocity_y > 0:
+                    sprite.rect.bottom = tile.top
+                    sprite.velocity_y = 0
+                    sprite.is_jumping = False
+                elif sprite.velocity_y < 0:
+                    sprite.rect.top = tile.bottom
+                    sprite.velocity_y = 0
+
+    def fall(self, sprite, map_height, step=UNIT_STEP):
+        """ Гравитация, пол карты и столкновения по Y для любого движущегося спрайта """
+        sprite.velocity_y += step(sprite.gravity)
+        new_y = sprite.rect.y + step.moved(sprite.velocity_y, sprite.gravity)
+
+        if new_y + sprite.rect.height > map_height:
+            sprite.rect.y = map_height - sprite.rect.height
+            sprite.velocity_y = 0
+            sprite.is_jumping = False
+        else:
+            sprite.rect.y = new_y
+
+        self.collide_y(sprite)
@@ -0,0 +1,218 @@
+import numpy as np
+import pygame as pg
+
+from assets import assets
+from collision import UNIT_STEP
+
+CELL_SIZE = 128
+CELL_STRIDE = 1 << 24
+CELL_OFFSET = 1 << 23
+
+
+class EnemyKind:
+    """ Общие для всех врагов одного вида скорость и кадры анимации """
+
+    def __init__(self, name, speed, frames, interval=200, gravity=2):
+        self.name = name
+        self.speed = speed
+        self.frames = frames
+        self.interval = interval
+        self.gravity = gravity
+
+
+class EnemyView:
+    """ Спрайтоподобный снимок одного врага для pg.sprite.collide_* """
+
+    def __init__(self, rect, image):
+        self.rect = rect
+        self.image = image
+        self.mask = assets.mask(image)
+
+
+class EnemySwarm:
+    """ Все патрулирующие враги уровня как набор массивов NumPy, шаг считается сразу для всех """
+
+    FIELDS = ("kind", "x", "y", "w", "h", "vx", "vy", "speed", "gravity", "left_edge", "right_edge",
+              "direction", "frame", "timer", "interval")
+
+    def __init__(self, kinds, map_width, map_height, tile_scale, cell_size=CELL_SIZE):
+        self.kinds = kinds
+        self.map_width = map_width * tile_scale
+        self.map_height = map_height * tile_scale
+        for name in self.FIELDS:
+            setattr(self, name, np.zeros(0, dtype=np.int64))
+        # Время симуляции дробное (шаг 1000/60 мс): целый таймер сменял бы кадр на тик раньше
+        self.timer = np.zeros(0, dtype=np.float64)
+        self.cell_size = cell_size
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.order = np.zeros(0, dtype=np.int64)
+        self.sorted_keys = np.zeros(0, dtype=np.int64)
+        self.indexed = True
+        self.reindexes = 0
+        self.candidates = 0
+
+    def __len__(self):
+        return len(self.x)
+
+    def spawn(self, kinds, start_pos, final_pos, now=0):
+        """ Добавить врагов пачкой: kinds — индексы видов, позиции — нижний левый угол в пикселях """
+        kinds = np.asarray(kinds, dtype=np.int64)
+        start_pos = np.asarray(start_pos, dtype=np.int64).reshape(-1, 2)
+        final_pos = np.asarray(final_pos, dtype=np.int64).reshape(-1, 2)
+        sizes = np.array([kind.frames[0].get_size() for kind in self.kinds], dtype=np.int64).reshape(-1, 2)
+        w = sizes[kinds, 0]
+        h = sizes[kinds, 1]
+        new = {
+            "kind": kinds,
+            "x": start_pos[:, 0],
+            "y": start_pos[:, 1] - h,
+            "w": w,
+            "h": h,
+            "vx": np.zeros_like(kinds),
+            "vy": np.zeros_like(kinds),
+            "speed": np.array([kind.speed for kind in self.kinds], dtype=np.int64)[kinds],
+            "gravity": np.array([kind.gravity for kind in self.kinds], dtype=np.int64)[kinds],
+            "left_edge": start_pos[:, 0],
+            "right_edge": final_pos[:, 0] + w,
+            "direction": np.ones_like(kinds),
+            "frame": np.zeros_like(kinds),
+            "timer": np.full(len(kinds), float(now)),
+            "interval": np.array([kind.interval for kind in self.kinds], dtype=np.int64)[kinds],
+        }
+        for name in self.FIELDS:
+            setattr(self, name, np.concatenate([getattr(self, name), new[name]]))
+        self.indexed = False
+
+    def keep(self, mask):
+        for name in self.FIELDS:
+            setattr(self, name, getattr(self, name)[mask])
+        self.indexed = False
+
+    def kill(self, indices):
+        mask = np.ones(len(self), dtype=bool)
+        mask[indices] = False
+        self.keep(mask)
+
+    def retime(self, now):
+        self.timer[:] = now
+
+    def solid(self, grid, cols, rows):
+        inside = (cols >= 0) & (cols < grid.width) & (rows >= 0) & (rows < grid.height)
+        result = np.zeros(len(cols), dtype=bool)
+        result[inside] = grid.gids[rows[inside], cols[inside]] != 0
+        return result
+
+    def solid_column(self, grid, cols, top, bottom):
+        hit = np.zeros(len(cols), dtype=bool)
+        first = top // grid.tile_height
+        last = (bottom - 1) // grid.tile_height
+        for k in range(int((last - first).max(initial=-1)) + 1):
+            rows = first + k
+            hit |= (rows <= last) & self.solid(grid, cols, rows)
+        return hit
+
+    def solid_row(self, grid, rows, left, right):
+        hit = np.zeros(len(rows), dtype=bool)
+        first = left // grid.tile_width
+        last = (right - 1) // grid.tile_width
+        for k in range(int((last - first).max(initial=-1)) + 1):
+            cols = first + k
+            hit |= (cols <= last) & self.solid(grid, cols, rows)
+        return hit
+
+    def sweep_rows(self, grid, falling, old_y):
+        """ Первый сплошной ряд на пути передней кромки от old_y до текущего y: быстрый враг не проскочит тайл """
+        old_rows = np.where(falling, (old_y + self.h - 1) // grid.tile_height, old_y // grid.tile_height)
+        new_rows = np.where(falling, (self.y + self.h - 1) // grid.tile_height, self.y // grid.tile_height)
+        step = np.where(falling, 1, -1)
+        # Ряд, где кромка уже стоит, проверяется, только если она из него не вышла
+        first = np.where(old_rows == new_rows, new_rows, old_rows + step)
+        span = np.where(self.vy != 0, (new_rows - first) * step + 1, 0)
+        rows = new_rows.copy()
+        hit = np.zeros(len(self), dtype=bool)
+        for k in range(int(span.max(initial=0))):
+            candidate = first + k * step
+            found = ~hit & (k < span) & self.solid_row(grid, candidate, self.x, self.x + self.w)
+            rows[found] = candidate[found]
+            hit |= found
+        return rows, hit
+
+    def update(self, grid, now, step=UNIT_STEP):
+        if not len(self):
+            return
+        right = self.direction > 0
+        self.vx = np.where(right, self.speed, -self.speed)
+        turn_left = right & (self.x + self.w >= self.right_edge)
+        turn_right = ~right & (self.x <= self.left_edge)
+        self.direction[turn_left] = -1
+        self.direction[turn_right] = 1
+
+        self.x += step(self.vx)
+        moving_right = self.vx > 0
+        cols = np.where(moving_right, (self.x + self.w - 1) // grid.tile_width, self.x // grid.tile_width)
+        hit = (self.vx != 0) & self.solid_column(grid, cols, self.y, self.y + self.h)
+        self.x = np.where(hit & moving_right, cols * grid.tile_width - self.w, self.x)
+        self.x = np.where(hit & ~moving_right, (cols + 1) * grid.tile_width, self.x)
+
+        self.vy += step(self.gravity)
+        old_y = self.y
+        new_y = self.y + step.moved(self.vy, self.gravity)
+        floor = new_y + self.h > self.map_height
+        self.y = np.where(floor, self.map_height - self.h, new_y)
+        self.vy[floor] = 0
+
+        falling = self.vy > 0
+        rows, hit = self.sweep_rows(grid, falling, old_y)
+        self.y = np.where(hit & falling, rows * grid.tile_height - self.h, self.y)
+        self.y = np.where(hit & ~falling, (rows + 1) * grid.tile_height, self.y)
+        self.vy[hit] = 0
+
+        due = now - self.timer > self.interval
+        if due.any():
+            frame_counts = np.array([len(kind.frames) for kind in self.kinds], dtype=np.int64)[self.kind]
+            self.frame[due] = (self.frame[due] + 1) % frame_counts[due]
+            self.timer[due] = now
+        self.indexed = False
+
+    def cell_key(self, cx, cy):
+        return (cy + CELL_OFFSET) * CELL_STRIDE + cx + CELL_OFFSET
+
+    def reindex(self):
+        """ Разложить врагов по ячейкам сетки по левому верхнему углу; пересортировка, только если кто-то сменил ячейку """
+        self.indexed = True
+        keys = self.cell_key(self.x // self.cell_size, self.y // self.cell_size)
+        if np.array_equal(keys, self.keys):
+            return
+        self.keys = keys
+        self.order = np.argsort(keys, kind="stable")
+        self.sorted_keys = keys[self.order]
+        self.reindexes += 1
+
+    def overlapping(self, rect):
+        """ Индексы врагов, чей прямоугольник пересекает rect, по возрастанию """
+        if not len(self):
+            return np.zeros(0, dtype=np.int64)
+        if not self.indexed:
+            self.reindex()
+        # Враг лежит в ячейке своего левого верхнего угла, поэтому окно запроса расширяется на размер врага
+        x0 = (rect.left - int(self.w.max())) // self.cell_size
+        x1 = (rect.right - 1) // self.cell_size
+        y0 = (rect.top - int(self.h.max())) // self.cell_size
+        y1 = (rect.bottom - 1) // self.cell_size
+        rows = [self.order[np.searchsorted(self.sorted_keys, self.cell_key(x0, cy), "left"):
+                           np.searchsorted(self.sorted_keys, self.cell_key(x1, cy), "right")]
+                for cy in range(y0, y1 + 1)]
+        # Внутри ряда ячеек индексы идут в порядке ключей, а не врагов, поэтому сортируем всегда
+        candidates = np.sort(np.concatenate(rows))
+        self.candidates += len(candidates)
+        return candidates[(self.x[candidates] < rect.right) & (self.x[candidates] + self.w[candidates] > rect.left)
+                          & (self.y[candidates] < rect.bottom) & (self.y[candidates] + self.h[candidates] > rect.top)]
+
+    def rect(self, i):
+        return pg.Rect(int(self.x[i]), int(self.y[i]), int(self.w[i]), int(self.h[i]))
+
+    def image(self, i):
+        return self.kinds[self.kind[i]].frames[self.frame[i]]
+
+    def view(self, i):
+        return EnemyView(self.rect(i), self.image(i))
@@ -0,0 +1,77 @@
+from collections import OrderedDict
+
+import pygame as pg
+
+HUD_SIZE = (240, 64)
+BAR_RECT = pg.Rect(10, 10, 100, 10)
+COINS_CENTER = (20, 40)
+
+
+class TextCache:
+    """ Отрендеренные надписи по (текст, цвет): font.render вызывается только для новых значений """
+
+    def __init__(self, font, max_items=64):
+        self.font = font
+        self.max_items = max_items
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, text, color):
+        key = (text, tuple(color))
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = self.surfaces[key] = self.font.render(text, True, color)
+        if len(self.surfaces) > self.max_items:
+            self.surfaces.popitem(last=False)
+        return surface
+
+
+class Hud:
+    """ Полоса здоровья и счётчик монет, собранные в одну поверхность; пересобирается при смене значений """
+
+    def __init__(self, font, screen_size):
+        self.text = TextCache(font)
+        self.screen_rect = pg.Rect((0, 0), screen_size)
+        self.overlay = pg.Surface(HUD_SIZE, pg.SRCALPHA)
+        if pg.display.get_surface() is not None:
+            self.overlay = self.overlay.convert_alpha()
+        self.values = None
+        self.message = None
+        self.drawn = []
+        self.composes = 0
+
+    def compose(self, hp, coins):
+        self.overlay.fill((0, 0, 0, 0))
+        pg.draw.rect(self.overlay, pg.Color("red"), (BAR_RECT.x, BAR_RECT.y, hp * 10, BAR_RECT.height))
+        pg.draw.rect(self.overlay, pg.Color("black"), BAR_RECT, 1)
+        text = self.text.render(f"{coins}", (0, 0, 0))
+        self.overlay.blit(text, text.get_rect(center=COINS_CENTER))
+        self.composes += 1
+
+    def update(self, hp, coins, message=None):
+        """ Запомнить новые значения; вернуть True, если HUD на экране надо перерисовать """
+        changed = False
+        if (hp, coins) != self.values:
+            self.values = (hp, coins)
+            self.compose(hp, coins)
+            changed = True
+        if message != self.message:
+            self.message = message
+            changed = True
+        return changed
+
+    def draw(self, surface):
+        """ Нарисовать HUD; вернуть прямоугольники, занятые им в этом и прошлом кадре """
+        rects = [surface.blit(self.overlay, (0, 0))]
+        if self.message:
+            text = self.text.render(self.message, (255, 0, 0))
+            rects.append(surface.blit(text, text.get_rect(center=self.screen_rect.center)))
+        dirty = [rect.clip(self.screen_rect) for rect in self.drawn + rects]
+        self.drawn = rects
+        return dirty
@@ -0,0 +1,278 @@
+import base64
+import gzip
+import hashlib
+import json
+import os
+import struct
+import sys
+import tempfile
+import xml.etree.ElementTree as ET
+import zlib
+
+import numpy as np
+import pygame as pg
+
+from assets import assets, tmx_image_loader
+from collision import merge_rects, rect_ids
+
+CACHE_VERSION = 3
+CACHE_DIR = "__levelcache__"
+APP_NAME = "Platformer-Slaughter"
+MAGIC = b"PLVLCACH"
+ALIGN = 64
+ENEMY_NAMES = ["Redic", "Cheese"]
+KEEP_LOADED = False
+loaded = {}
+
+
+def level_sources(map_dir, number):
+    """ Файлы, от которых зависит уровень: tmx, список врагов, tsx и картинки тайлсетов """
+    tmx_path = os.path.join(map_dir, f"level{number}.tmx")
+    sources = [tmx_path, os.path.join(map_dir, f"level{number}_enemies.json")]
+    for _, element in ET.iterparse(tmx_path):
+        if element.tag == "layer":
+            break
+        if element.tag != "tileset" or "source" not in element.attrib:
+            continue
+        tsx_path = os.path.join(map_dir, element.attrib["source"])
+        sources.append(tsx_path)
+        image = ET.parse(tsx_path).find("image")
+        if image is not None:
+            sources.append(os.path.join(os.path.dirname(tsx_path), image.attrib["source"]))
+    return sources
+
+
+def source_hash(map_dir, number, scale):
+    digest = hashlib.sha1(f"{CACHE_VERSION}:{scale}".encode())
+    for path in level_sources(map_dir, number):
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def decode_chunk(data, text):
+    encoding = data.get("encoding")
+    if encoding == "csv":
+        return np.array([int(value) for value in text.replace("\n", "").split(",") if value.strip()],
+                        dtype=np.uint32)
+    if encoding == "base64":
+        raw = base64.b64decode(text.strip())
+        compression = data.get("compression")
+        if compression == "zlib":
+            raw = zlib.decompress(raw)
+        elif compression == "gzip":
+            raw = gzip.decompress(raw)
+        elif compression:
+            raise ValueError(f"Unsupported chunk compression: {compression}")
+        return np.frombuffer(raw, dtype="<u4").astype(np.uint32)
+    raise ValueError(f"Unsupported chunk encoding: {encoding}")
+
+
+def flatten_infinite(root):
+    """ Переписать чанки бесконечной карты Tiled в обычные csv-слои; вернуть сдвиг начала в тайлах """
+    layers = [(layer, layer.find("data")) for layer in root.iter("layer")]
+    chunks = [chunk for _, data in layers for chunk in data.findall("chunk")]
+    if not chunks:
+        return 0, 0
+    x0 = min(int(chunk.get("x")) for chunk in chunks)
+    y0 = min(int(chunk.get("y")) for chunk in chunks)
+    width = max(int(chunk.get("x")) + int(chunk.get("width")) for chunk in chunks) - x0
+    height = max(int(chunk.get("y")) + int(chunk.get("height")) for chunk in chunks) - y0
+
+    for layer, data in layers:
+        grid = np.zeros((height, width), dtype=np.uint32)
+        for chunk in data.findall("chunk"):
+            x, y = int(chunk.get("x")) - x0, int(chunk.get("y")) - y0
+            w, h = int(chunk.get("width")), int(chunk.get("height"))
+            grid[y:y + h, x:x + w] = decode_chunk(data, chunk.text).reshape(h, w)
+        data.clear()
+        data.set("encoding", "csv")
+        data.text = "\n" + ",\n".join(",".join(map(str, row)) for row in grid.tolist()) + "\n"
+        layer.set("width", str(width))
+        layer.set("height", str(height))
+    root.set("infinite", "0")
+    root.set("width", str(width))
+    root.set("height", str(height))
+    return x0, y0
+
+
+def compile_level(map_dir, number, scale):
+    """ Разобрать tmx и json врагов в набор плоских массивов и метаданные """
+    import pytmx
+
+    tmx_path = os.path.join(map_dir, f"level{number}.tmx")
+    root = ET.parse(tmx_path).getroot()
+    origin = flatten_infinite(root) if root.get("infinite") == "1" else (0, 0)
+    tmx_map = pytmx.TiledMap(image_loader=tmx_image_loader)
+    tmx_map.filename = tmx_path
+    tmx_map.parse_xml(root)
+    width, height = tmx_map.width, tmx_map.height
+    tile_size = (tmx_map.tilewidth * scale, tmx_map.tileheight * scale)
+    layers = {name: np.zeros((height, width), dtype=np.uint32) for name in ("Game", "Collision")}
+    points = {"Coins": [], "Portal": []}
+    images = {}
+
+    for layer in tmx_map:
+        if not isinstance(layer, pytmx.TiledTileLayer):
+            continue
+        for x, y, gid in layer:
+            tile = tmx_map.get_tile_image_by_gid(gid)
+            if not tile:
+                continue
+            if layer.name in layers:
+                layers[layer.name][y, x] = gid
+                if gid not in images:
+                    images[gid] = pg.image.tobytes(pg.transform.scale(tile, tile_size), "RGBA")
+            elif layer.name in points:
+                points[layer.name].append((x, y))
+
+    with open(os.path.join(map_dir, f"level{number}_enemies.json"), "r") as json_file:
+        enemies = [enemy for enemy in json.load(json_file)["enemies"] if enemy["name"] in ENEMY_NAMES]
+    for enemy in enemies:
+        enemy["start_pos"] = [enemy["start_pos"][0] - origin[0], enemy["start_pos"][1] - origin[1]]
+        enemy["final_pos"] = [enemy["final_pos"][0] - origin[0], enemy["final_pos"][1] - origin[1]]
+
+    atlas_gids = sorted(images)
+    atlas = np.zeros((len(atlas_gids), tile_size[1], tile_size[0], 4), dtype=np.uint8)
+    for i, gid in enumerate(atlas_gids):
+        atlas[i] = np.frombuffer(images[gid], dtype=np.uint8).reshape(tile_size[1], tile_size[0], 4)
+
+    solid_rects = merge_rects(layers["Game"])
+    arrays = {
+        "gids": layers["Game"],
+        "solid_rects": solid_rects,
+        "solid_ids": rect_ids(solid_rects, width, height),
+        "collision_gids": layers["Collision"],
+        "coins": np.array(points["Coins"], dtype=np.int32).reshape(-1, 2),
+        "portals": np.array(points["Portal"], dtype=np.int32).reshape(-1, 2),
+        "enemy_kinds": np.array([ENEMY_NAMES.index(enemy["name"]) for enemy in enemies], dtype=np.uint8),
+        "enemy_starts": np.array([enemy["start_pos"] for enemy in enemies], dtype=np.int32).reshape(-1, 2),
+        "enemy_finals": np.array([enemy["final_pos"] for enemy in enemies], dtype=np.int32).reshape(-1, 2),
+        "atlas_gids": np.array(atlas_gids, dtype=np.uint32),
+        "atlas": atlas,
+    }
+    meta = {"width": width, "height": height, "tile_width": tmx_map.tilewidth,
+            "tile_height": tmx_map.tileheight, "scale": scale, "origin": list(origin)}
+    return meta, arrays
+
+
+def write_cache(path, meta, arrays):
+    """ Заголовок JSON и выровненные сырые массивы подряд, чтобы читать через np.memmap """
+    entries = {}
+    offset = 0
+    for name, array in arrays.items():
+        entries[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += -(-array.nbytes // ALIGN) * ALIGN
+    header = json.dumps({"meta": meta, "arrays": entries}).encode()
+    data_start = -(-(len(MAGIC) + 4 + len(header)) // ALIGN) * ALIGN
+
+    # Своё временное имя у каждого писателя: процессы batch.py могут собирать один и тот же уровень разом
+    fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC + struct.pack("<I", len(header)) + header)
+            for name, array in arrays.items():
+                f.seek(data_start + entries[name]["offset"])
+                f.write(np.ascontiguousarray(array).tobytes())
+            f.truncate(data_start + offset)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def read_cache(path):
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a level cache")
+        header_length = struct.unpack("<I", f.read(4))[0]
+        header = json.loads(f.read(header_length))
+    data_start = -(-(len(MAGIC) + 4 + header_length) // ALIGN) * ALIGN
+
+    arrays = {}
+    for name, entry in header["arrays"].items():
+        shape = tuple(entry["shape"])
+        if 0 in shape:
+            arrays[name] = np.zeros(shape, dtype=entry["dtype"])
+        else:
+            arrays[name] = np.memmap(path, dtype=entry["dtype"], mode="c",
+                                     offset=data_start + entry["offset"], shape=shape)
+    return header["meta"], arrays
+
+
+class LevelData:
+    """ Скомпилированный уровень: сетки gid, точки монет и порталов, враги и атлас тайлов """
+
+    def __init__(self, meta, arrays):
+        self.__dict__.update(meta)
+        self.__dict__.update(arrays)
+        self.atlas_index = {int(gid): i for i, gid in enumerate(self.atlas_gids)}
+        self.images = {}
+
+    def tiles(self, grid, x0=0, y0=0, x1=None, y1=None):
+        """ (x, y, gid) занятых клеток в прямоугольнике тайлов по строкам, как их отдаёт слой pytmx """
+        region = grid[y0:y1, x0:x1]
+        rows, cols = np.nonzero(region)
+        return zip((cols + x0).tolist(), (rows + y0).tolist(), region[rows, cols].tolist())
+
+    def points_in(self, points, x0, y0, x1, y1):
+        """ Индексы точек (монет, порталов), попавших в прямоугольник тайлов """
+        return np.flatnonzero((points[:, 0] >= x0) & (points[:, 0] < x1)
+                              & (points[:, 1] >= y0) & (points[:, 1] < y1)).tolist()
+
+    def tile_image(self, gid):
+        if gid not in self.images:
+            self.images[gid] = assets.tile(self.atlas[self.atlas_index[gid]])
+        return self.images[gid]
+
+
+def load_level_data(map_dir, number, scale, cache_dir=None):
+    """ Взять уровень из кэша, если хэш исходников совпал, иначе скомпилировать и сохранить;
+    при KEEP_LOADED один раз загруженный уровень отдаётся из памяти без проверки файлов """
+    key = (os.path.abspath(map_dir), number, scale)
+    if KEEP_LOADED and key in loaded:
+        return loaded[key]
+    data = read_level_data(map_dir, number, scale, cache_dir)
+    if KEEP_LOADED:
+        loaded[key] = data
+    return data
+
+
+def default_cache_dir(map_dir):
+    """ Куда класть кэш уровней. Рядом с картами при запуске из исходников; у собранного PyInstaller exe карты
+    лежат во временном _MEIPASS, который удаляется при выходе, поэтому кэш идёт в папку пользователя """
+    override = os.environ.get("PLATFORMER_CACHE_DIR")
+    if override:
+        return override
+    if not getattr(sys, "frozen", False):
+        return os.path.join(map_dir, CACHE_DIR)
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, APP_NAME, CACHE_DIR)
+
+
+def read_level_data(map_dir, number, scale, cache_dir=None):
+    cache_dir = cache_dir or default_cache_dir(map_dir)
+    cache_path = os.path.join(cache_dir, f"level{number}.lvl")
+    digest = source_hash(map_dir, number, scale)
+
+    if os.path.exists(cache_path):
+        try:
+            meta, arrays = read_cache(cache_path)
+            if meta.get("source_hash") == digest:
+                return LevelData(meta, arrays)
+        except (OSError, ValueError):
+            pass
+
+    meta, arrays = compile_level(map_dir, number, scale)
+    meta["source_hash"] = digest
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        write_cache(cache_path, meta, arrays)
+    except OSError:
+        pass
+    return LevelData(meta, arrays)
@@ -0,0 +1,32 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+class LevelLoader:
+    """ Готовит следующий уровень в фоновом потоке, пока играется текущий """
+
+    def __init__(self, build, map_dir):
+        self.build = build
+        self.map_dir = map_dir
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="level-loader")
+        self.pending = {}
+
+    def exists(self, number):
+        return os.path.exists(os.path.join(self.map_dir, f"level{number}.tmx"))
+
+    def preload(self, number):
+        if number not in self.pending and self.exists(number):
+            self.pending[number] = self.executor.submit(self.build, number, self.map_dir)
+
+    def get(self, number):
+        """ Готовый уровень из фона; если его не заказывали, собрать здесь же """
+        future = self.pending.pop(number, None)
+        if future is None:
+            return self.build(number, self.map_dir)
+        return future.result()
+
+    def shutdown(self):
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,55 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+
+from logging import DEBUG, INFO, WARNING, ERROR
+
+LOG_FILE = "error_log.txt"
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUPS = 3
+
+logger = logging.getLogger("platformer")
+logger.setLevel(os.environ.get("PLATFORMER_LOG_LEVEL", "INFO").upper())
+logger.propagate = False
+listener = None
+
+
+def setup_logging(path=LOG_FILE, max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS):
+    """ Записи уходят в очередь, файл с ротацией по размеру пишет фоновый поток """
+    global listener
+    if listener is not None:
+        return
+    records = queue.SimpleQueue()
+    handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                                   encoding="utf-8", delay=True)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    listener = logging.handlers.QueueListener(records, handler)
+    listener.start()
+    logger.addHandler(logging.handlers.QueueHandler(records))
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """ Дописать очередь на диск и остановить поток записи """
+    global listener
+    if listener is None:
+        return
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+    logger.handlers.clear()
+    listener = None
+
+
+def set_level(level):
+    logger.setLevel(level)
+
+
+def log(message, level=INFO):
+    if not logger.isEnabledFor(level):
+        return
+    if listener is None:
+        setup_logging()
+    logger.log(level, message)
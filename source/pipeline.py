@@ -0,0 +1,93 @@
+import queue
+import threading
+import traceback
+from collections import namedtuple
+
+import pygame as pg
+
+from logger import DEBUG, ERROR, log
+from profiler import profiler
+
+PIPELINE_DEPTH = 1
+PUT_TIMEOUT = 0.1
+
+# Всё, что нужно для кадра, снятое с мира: блиты (картинка, позиция на экране, область), значения HUD,
+# признак стоящего мира и табличка профилировщика (картинка, позиция) или None
+RenderList = namedtuple("RenderList", ["world", "hp", "coins", "message", "frozen", "overlay"])
+
+
+class Renderer:
+    """ Собирает кадр из списка отрисовки и выводит его на экран; сам мир не читает """
+
+    def __init__(self, screen, background, hud):
+        self.screen = screen
+        self.background = background
+        self.hud = hud
+        self.scene = None
+
+    def draw(self, frame):
+        changed = self.hud.update(frame.hp, frame.coins, frame.message)
+        if not frame.frozen or self.scene is None or frame.overlay is not None:
+            with profiler.section("draw.world"):
+                self.screen.blit(self.background, (0, 0))
+                self.screen.blits(frame.world, doreturn=False)
+            self.scene = self.screen.copy() if frame.frozen else None
+            with profiler.section("draw.hud"):
+                self.hud.draw(self.screen)
+                if frame.overlay is not None:
+                    self.screen.blit(*frame.overlay)
+            with profiler.section("draw.flip"):
+                pg.display.flip()
+        elif changed:
+            # Мир стоит: вернуть фон под старым HUD и обновить на экране только его прямоугольники
+            for rect in self.hud.drawn:
+                self.screen.blit(self.scene, rect, rect)
+            pg.display.update(self.hud.draw(self.screen))
+
+
+class RenderThread:
+    """ Поток отрисовки: пока симуляция считает кадр N, он собирает и выводит кадр N-1.
+    Очередь между ними ограничена, так что симуляция не убегает вперёд больше чем на depth кадров """
+
+    def __init__(self, renderer, depth=PIPELINE_DEPTH):
+        self.renderer = renderer
+        self.frames = queue.Queue(maxsize=depth)
+        self.error = None
+        self.drawn = 0
+        self.thread = threading.Thread(target=self.loop, name="render", daemon=True)
+        self.thread.start()
+        log(f"Render thread started, queue depth {depth}", DEBUG)
+
+    def loop(self):
+        while True:
+            frame = self.frames.get()
+            if frame is None:
+                return
+            try:
+                self.renderer.draw(frame)
+            except Exception as e:
+                self.error = e
+                log(f"Render thread failed: {e}", ERROR)
+                log(traceback.format_exc(), ERROR)
+                return
+            self.drawn += 1
+
+    @property
+    def alive(self):
+        return self.error is None and self.thread.is_alive()
+
+    def submit(self, frame):
+        """ Отдать кадр потоку; False, если поток остановился и рисовать надо самим """
+        # Ждём место в очереди, но не вечно: упавший поток её уже не разберёт
+        while self.alive:
+            try:
+                self.frames.put(frame, timeout=PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def stop(self):
+        """ Дорисовать уже отданные кадры и остановить поток """
+        self.submit(None)
+        self.thread.join()
@@ -1,22 +1,49 @@
+import time
+
+IMPORT_STARTED = time.perf_counter()
+
 import pygame as pg
-import pytmx
-import json
+from collections import namedtuple
+import argparse
 import sys
 import os
 import traceback
 
-pg.init()
-
-def log(message):
-    with open("error_log.txt", "a", encoding="utf-8") as f:
-        f.write(message + "\n")
-
-log("Starting the game.")
+from animation import Animation, AnimationClock
+from assets import assets
+from collision import UNIT_STEP, MaskTester, Step, TileGrid
+from enemies import EnemyKind, EnemySwarm
+from hud import Hud
+from levelcache import ENEMY_NAMES, load_level_data
+from loader import LevelLoader
+from logger import DEBUG, ERROR, WARNING, log
+from pipeline import Renderer, RenderList, RenderThread
+from pool import SpritePool
+from profiler import ProfilerOverlay, StartupTimes, profiler
+from render import SpatialGroup, StaticLayer
+from replay import Recorder
+import snapshot
+from streaming import ChunkStreamer
+
+IMPORT_TIME = time.perf_counter() - IMPORT_STARTED
 
 SCREEN_WIDTH = 900
 SCREEN_HEIGHT = 600
 FPS = 80
 TILE_SCALE = 2
+BAKE_STATIC_LAYERS = True
+TICK_MS = 1000 / 60
+UPDATE_RATE = 60
+MAX_CATCH_UP = 5
+INTERPOLATE = True
+BALL_POOL_SIZE = 32
+BALL_LIFETIME = 3000
+STREAM_LEVELS = False
+STREAM_CHUNK_TILES = 32
+STREAM_RADIUS = 1
+PIPELINE_RENDER = False
+
+Inputs = namedtuple("Inputs", ["left", "right", "jump", "fire", "restart"], defaults=[False] * 5)
 
 def resource_path(relative_path):
     """ Получение абсолютного пути к ресурсу, работает для обычного файла (.py) и для PyInstaller """
@@ -27,36 +54,41 @@ def resource_path(relative_path):
 
     return os.path.join(base_path, relative_path)
 
-try:
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    log(f"BASE_DIR: {BASE_DIR}")
-
-    background_path = resource_path("Resources/map/background.jpg")
-    log(f"Background path: {background_path}")
+def init_display():
+    """ Поднять только нужные игре подсистемы pygame: окно с событиями и шрифты, без звука и джойстиков """
+    pg.display.init()
+    pg.font.init()
 
-    background = pg.image.load(background_path)
-    background = pg.transform.scale(background, (SCREEN_WIDTH, SCREEN_HEIGHT))
-    font = pg.font.Font(None, 36)
-except Exception as e:
-    log(f"Error during initialization: {e}")
-    log(traceback.format_exc())
-    raise
+def load_background():
+    """ Фон, один раз растянутый под окно """
+    try:
+        background_path = resource_path("Resources/map/background.jpg")
+        log(f"Background path: {background_path}")
+        background = pg.image.load(background_path)
+        # Непрозрачный 24-битный фон копируется на 32-битный экран быстрее, чем его convert()-копия
+        return pg.transform.scale(background, (SCREEN_WIDTH, SCREEN_HEIGHT))
+    except Exception as e:
+        log(f"Error during initialization: {e}", ERROR)
+        log(traceback.format_exc(), ERROR)
+        raise
 
 class Platform(pg.sprite.Sprite):
     def __init__(self, image, x, y, width, height):
         super(Platform, self).__init__()
-        log("Initializing Platform")
-        self.image = pg.transform.scale(image, (width * TILE_SCALE, height * TILE_SCALE))
+        log("Initializing Platform", DEBUG)
+        self.image = image
+        if image.get_size() != (width * TILE_SCALE, height * TILE_SCALE):
+            self.image = pg.transform.scale(image, (width * TILE_SCALE, height * TILE_SCALE))
         self.rect = self.image.get_rect()
         self.rect.x = x * TILE_SCALE
         self.rect.y = y * TILE_SCALE
 
 class Player(pg.sprite.Sprite):
-    def __init__(self, map_width, map_height):
+    def __init__(self, map_width, map_height, now=0):
         super(Player, self).__init__()
-        log("Initializing Player")
+        log("Initializing Player", DEBUG)
         self.hp = 10
-        self.damage_timer = pg.time.get_ticks()
+        self.damage_timer = now
         self.damage_interval = 1000
         self.load_animations()
         self.current_animation = self.idle_animation_right
@@ -73,296 +105,123 @@ class Player(pg.sprite.Sprite):
         self.map_width = map_width * TILE_SCALE
         self.map_height = map_height * TILE_SCALE
 
-        self.timer = pg.time.get_ticks()
+        self.timer = now
         self.interval = 200
 
     def load_animations(self):
-        log("Loading Player animations")
+        log("Loading Player animations", DEBUG)
         tile_size = 16
         tile_scale = 4
 
-        self.idle_animation_right = []
+        size = (tile_scale * tile_size, tile_scale * tile_size)
+
         num_image = 2
+        path = resource_path("Resources/sprites/Sprite Pack 2/1 - Onion Lad/Idle (16 x 16).png")
         try:
-            spritesheet = pg.image.load(resource_path("Resources/sprites/Sprite Pack 2/1 - Onion Lad/Idle (16 x 16).png"))
+            self.idle_animation_right = assets.strip(path, num_image, tile_size, tile_size, size)
+            self.idle_animation_left = assets.strip(path, num_image, tile_size, tile_size, size, flip=True)
         except Exception as e:
-            log(f"Error loading Player idle spritesheet: {e}")
-            log(traceback.format_exc())
+            log(f"Error loading Player idle spritesheet: {e}", ERROR)
+            log(traceback.format_exc(), ERROR)
             raise
 
-        for i in range(num_image):
-            x = i * tile_size
-            y = 0
-            rect = pg.Rect(x, y, tile_size, tile_size)
-            image = spritesheet.subsurface(rect)
-            image = pg.transform.scale(image, (tile_scale * tile_size, tile_scale * tile_size))
-            self.idle_animation_right.append(image)
-        self.idle_animation_left = [pg.transform.flip(image, True, False) for image in self.idle_animation_right]
-
-        self.run_animation_right = []
         num_image = 2
+        path = resource_path("Resources/sprites/Sprite Pack 2/1 - Onion Lad/Run_&_Jump (16 x 16).png")
         try:
-            spritesheet = pg.image.load(resource_path("Resources/sprites/Sprite Pack 2/1 - Onion Lad/Run_&_Jump (16 x 16).png"))
+            self.run_animation_right = assets.strip(path, num_image, tile_size, tile_size, size)
+            self.run_animation_left = assets.strip(path, num_image, tile_size, tile_size, size, flip=True)
         except Exception as e:
-            log(f"Error loading Player run spritesheet: {e}")
-            log(traceback.format_exc())
+            log(f"Error loading Player run spritesheet: {e}", ERROR)
+            log(traceback.format_exc(), ERROR)
             raise
 
-        for i in range(num_image):
-            x = i * tile_size
-            y = 0
-            rect = pg.Rect(x, y, tile_size, tile_size)
-            image = spritesheet.subsurface(rect)
-            image = pg.transform.scale(image, (tile_scale * tile_size, tile_scale * tile_size))
-            self.run_animation_right.append(image)
-        self.run_animation_left = [pg.transform.flip(image, True, False) for image in self.run_animation_right]
-
-    def update(self, platforms):
-        keys = pg.key.get_pressed()
-        if keys[pg.K_SPACE] and not self.is_jumping:
+    def update(self, platforms, inputs, now, step=UNIT_STEP):
+        """ Скорости заданы в пикселях на тик 60 Гц, step переводит их в пиксели за шаг """
+        if inputs.jump and not self.is_jumping:
             self.jump()
-        if keys[pg.K_a]:
+        acceleration = 0
+        if inputs.left:
             if self.current_animation != self.run_animation_left:
                 self.current_animation = self.run_animation_left
                 self.current_image = 0
                 self.direction = "left"
-            self.velocity_x -= 2
-        elif keys[pg.K_d]:
+            acceleration = -2
+            self.velocity_x += step(acceleration)
+        elif inputs.right:
             if self.current_animation != self.run_animation_right:
                 self.current_animation = self.run_animation_right
                 self.current_image = 0
                 self.direction = "right"
-            self.velocity_x += 2
+            acceleration = 2
+            self.velocity_x += step(acceleration)
         else:
             if self.current_animation in [self.run_animation_right, self.run_animation_left]:
                 self.current_animation = self.idle_animation_right if self.current_animation == self.run_animation_right else self.idle_animation_left
                 self.current_image = 0
             self.velocity_x = 0
 
-        self.rect.x += self.velocity_x
+        self.rect.x += step.moved(self.velocity_x, acceleration)
         if self.rect.left < 0:
             self.rect.x = 0
         if self.rect.x > 1250:
             self.rect.y = 50
-            self.rect.x -= 10
-
-        for platform in platforms:
-            if self.rect.colliderect(platform.rect):
-                if self.velocity_x > 0:
-                    self.rect.right = platform.rect.left
-                elif self.velocity_x < 0:
-                    self.rect.left = platform.rect.right
-
-        self.velocity_y += self.gravity
-        new_y = self.rect.y + self.velocity_y
-
-        if new_y + self.rect.height > self.map_height:
-            self.rect.y = self.map_height - self.rect.height
-            self.velocity_y = 0
-            self.is_jumping = False
-        else:
-            self.rect.y = new_y
-
-        for platform in platforms:
-            if self.rect.colliderect(platform.rect):
-                if self.velocity_y > 0:
-                    self.rect.bottom = platform.rect.top
-                    self.velocity_y = 0
-                    self.is_jumping = False
-                elif self.velocity_y < 0:
-                    self.rect.top = platform.rect.bottom
-                    self.velocity_y = 0
-        if pg.time.get_ticks() - self.timer > self.interval:
+            self.rect.x -= step(10)
+
+        platforms.collide_x(self)
+        platforms.fall(self, self.map_height, step)
+
+        if now - self.timer > self.interval:
             self.current_image += 1
             if self.current_image >= len(self.current_animation):
                 self.current_image = 0
             self.image = self.current_animation[self.current_image]
-            self.timer = pg.time.get_ticks()
+            self.timer = now
+
+    @property
+    def mask(self):
+        return assets.mask(self.image)
 
     def jump(self):
         self.velocity_y = -30
         self.is_jumping = True
 
-    def get_damage(self):
-        if pg.time.get_ticks() - self.damage_timer > self.damage_interval:
+    def get_damage(self, now):
+        if now - self.damage_timer > self.damage_interval:
             self.hp -= 1
-            self.damage_timer = pg.time.get_ticks()
-
-class Cheese(pg.sprite.Sprite):
-    def __init__(self, map_width, map_height, start_pos, final_pos):
-        super(Cheese, self).__init__()
-        log("Initializing Cheese")
-        self.load_animations()
-        self.current_animation = self.animation
-        self.image = self.current_animation[0]
-        self.current_image = 0
-
-        self.rect = self.image.get_rect()
-        self.rect.bottomleft = start_pos
-
-        self.velocity_x = 0
-        self.velocity_y = 0
-        self.gravity = 2
-        self.is_jumping = False
-        self.map_width = map_width * TILE_SCALE
-        self.map_height = map_height * TILE_SCALE
-        self.left_edge = start_pos[0]
-        self.right_edge = final_pos[0] + self.image.get_width()
-
-        self.timer = pg.time.get_ticks()
-        self.interval = 200
-
-        self.direction = "right"
-
-    def load_animations(self):
-        log("Loading Cheese animations")
-        tile_scale = 4
-        tile_size = 16
-
-        self.animation = []
-        image = pg.image.load(resource_path("Resources/sprites/Sprite Pack 2/8 - Comrade Cheese Puff/Hurt (16 x 16).png"))
-        image = pg.transform.scale(image, (tile_scale * tile_size, tile_scale * tile_size))
-        self.animation.append(image)
-        self.animation.append(pg.transform.flip(image, True, False))
-
-    def update(self, platforms):
-        if self.direction == "right":
-            self.velocity_x = 10
-            if self.rect.right >= self.right_edge:
-                self.direction = "left"
-        elif self.direction == "left":
-            self.velocity_x = -10
-            if self.rect.left <= self.left_edge:
-                self.direction = "right"
-
-        self.rect.x += self.velocity_x
-
-        for platform in platforms:
-            if self.rect.colliderect(platform.rect):
-                if self.velocity_x > 0:
-                    self.rect.right = platform.rect.left
-                elif self.velocity_x < 0:
-                    self.rect.left = platform.rect.right
-
-        self.velocity_y += self.gravity
-        new_y = self.rect.y + self.velocity_y
-
-        if new_y + self.rect.height > self.map_height:
-            self.rect.y = self.map_height - self.rect.height
-            self.velocity_y = 0
-            self.is_jumping = False
-        else:
-            self.rect.y = new_y
-
-        for platform in platforms:
-            if self.rect.colliderect(platform.rect):
-                if self.velocity_y > 0:
-                    self.rect.bottom = platform.rect.top
-                    self.velocity_y = 0
-                    self.is_jumping = False
-                elif self.velocity_y < 0:
-                    self.rect.top = platform.rect.bottom
-                    self.velocity_y = 0
-        if pg.time.get_ticks() - self.timer > self.interval:
-            self.current_image += 1
-            if self.current_image >= len(self.current_animation):
-                self.current_image = 0
-            self.image = self.current_animation[self.current_image]
-            self.timer = pg.time.get_ticks()
-
-class Redic(pg.sprite.Sprite):
-    def __init__(self, map_width, map_height, start_pos, final_pos):
-        super(Redic, self).__init__()
-        log("Initializing Redic")
-        self.load_animations()
-        self.current_animation = self.animation
-        self.image = self.current_animation[0]
-        self.current_image = 0
-
-        self.rect = self.image.get_rect()
-        self.rect.bottomleft = start_pos
-
-        self.velocity_x = 0
-        self.velocity_y = 0
-        self.gravity = 2
-        self.is_jumping = False
-        self.map_width = map_width * TILE_SCALE
-        self.map_height = map_height * TILE_SCALE
-        self.left_edge = start_pos[0]
-        self.right_edge = final_pos[0] + self.image.get_width()
-
-        self.timer = pg.time.get_ticks()
-        self.interval = 200
-
-        self.direction = "right"
-
-    def load_animations(self):
-        log("Loading Redic animations")
-        tile_scale = 4
-        tile_size = 16
-
-        self.animation = []
-        image = pg.image.load(resource_path("Resources/sprites/Sprite Pack 2/5 - Daikon/Hurt (16 x 32).png"))
-        image = pg.transform.scale(image, (tile_scale * tile_size, tile_scale * tile_size))
-        self.animation.append(image)
-        self.animation.append(pg.transform.flip(image, True, False))
-
-    def update(self, platforms):
-        if self.direction == "right":
-            self.velocity_x = 5
-            if self.rect.right >= self.right_edge:
-                self.direction = "left"
-        elif self.direction == "left":
-            self.velocity_x = -5
-            if self.rect.left <= self.left_edge:
-                self.direction = "right"
-
-        self.rect.x += self.velocity_x
-
-        for platform in platforms:
-            if self.rect.colliderect(platform.rect):
-                if self.velocity_x > 0:
-                    self.rect.right = platform.rect.left
-                elif self.velocity_x < 0:
-                    self.rect.left = platform.rect.right
-
-        self.velocity_y += self.gravity
-        new_y = self.rect.y + self.velocity_y
-
-        if new_y + self.rect.height > self.map_height:
-            self.rect.y = self.map_height - self.rect.height
-            self.velocity_y = 0
-            self.is_jumping = False
-        else:
-            self.rect.y = new_y
-
-        for platform in platforms:
-            if self.rect.colliderect(platform.rect):
-                if self.velocity_y > 0:
-                    self.rect.bottom = platform.rect.top
-                    self.velocity_y = 0
-                    self.is_jumping = False
-                elif self.velocity_y < 0:
-                    self.rect.top = platform.rect.bottom
-                    self.velocity_y = 0
-        if pg.time.get_ticks() - self.timer > self.interval:
-            self.current_image += 1
-            if self.current_image >= len(self.current_animation):
-                self.current_image = 0
-            self.image = self.current_animation[self.current_image]
-            self.timer = pg.time.get_ticks()
+            self.damage_timer = now
+
+ENEMY_SHEETS = {
+    "Redic": (5, "Resources/sprites/Sprite Pack 2/5 - Daikon/Hurt (16 x 32).png"),
+    "Cheese": (10, "Resources/sprites/Sprite Pack 2/8 - Comrade Cheese Puff/Hurt (16 x 16).png"),
+}
+
+def load_enemy_kinds():
+    log("Loading enemy animations", DEBUG)
+    tile_scale = 4
+    tile_size = 16
+    size = (tile_scale * tile_size, tile_scale * tile_size)
+
+    kinds = []
+    for name in ENEMY_NAMES:
+        speed, sheet = ENEMY_SHEETS[name]
+        path = resource_path(sheet)
+        kinds.append(EnemyKind(name, speed, [assets.frame(path, size=size), assets.frame(path, size=size, flip=True)]))
+    return kinds
 
 class Ball(pg.sprite.Sprite):
-    def __init__(self, player_rect, direction):
+    def __init__(self):
         super(Ball, self).__init__()
-        log("Initializing Ball")
-        self.direction = direction
+        log("Initializing Ball", DEBUG)
+        self.direction = "right"
         self.speed = 10
+        self.launched = 0
 
-        self.image = pg.image.load(resource_path("Resources/sprites/ball.png"))
-        self.image = pg.transform.scale(self.image, (30, 30))
-
+        self.image = assets.frame(resource_path("Resources/sprites/ball.png"), size=(30, 30))
         self.rect = self.image.get_rect()
+
+    def launch(self, player_rect, direction, now):
+        self.direction = direction
+        self.launched = now
         if self.direction == "right":
             self.rect.x = player_rect.right
         else:
@@ -371,270 +230,544 @@ class Ball(pg.sprite.Sprite):
 
         self.rect.y = player_rect.centery
 
-    def update(self):
+    def update(self, step=UNIT_STEP):
         if self.direction == "right":
-            self.rect.x += self.speed
+            self.rect.x += step(self.speed)
         else:
-            self.rect.x -= self.speed
+            self.rect.x -= step(self.speed)
 
 class Coin(pg.sprite.Sprite):
-    def __init__(self, x, y):
+    def __init__(self, x, y, animation):
         super(Coin, self).__init__()
-        log("Initializing Coin")
-        self.load_animations()
-        self.image = self.images[0]
+        log("Initializing Coin", DEBUG)
+        self.animation = animation
         self.rect = self.image.get_rect()
         self.rect.x = x
         self.rect.y = y
 
-        self.current_image = 0
-        self.timer = pg.time.get_ticks()
-        self.interval = 200
-
-    def load_animations(self):
-        log("Loading Coin animations")
-        tile_size = 16
-        tile_scale = 2
-
-        self.images = []
+    @property
+    def image(self):
+        """ Кадр общей для всех монет анимации: монета сама ничего не считает """
+        return self.animation.image
 
-        num_images = 5
-        spritesheet = pg.image.load(resource_path("Resources/Coin_Gems/MonedaP.png"))
+def load_coin_animation():
+    log("Loading Coin animations", DEBUG)
+    tile_size = 16
+    tile_scale = 2
 
-        for i in range(num_images):
-            x = i * tile_size
-            y = 0
-            rect = pg.Rect(x, y, tile_size, tile_size)
-            image = spritesheet.subsurface(rect)
-            image = pg.transform.scale(image, (tile_scale * tile_size, tile_scale * tile_size))
-            self.images.append(image)
-
-    def update(self):
-        if pg.time.get_ticks() - self.timer > self.interval:
-            self.current_image += 1
-            if self.current_image > len(self.images) - 1:
-                self.current_image = 0
-            self.image = self.images[self.current_image]
-            self.timer = pg.time.get_ticks()
+    num_images = 5
+    return Animation(assets.strip(resource_path("Resources/Coin_Gems/MonedaP.png"), num_images,
+                                  tile_size, tile_size, (tile_scale * tile_size, tile_scale * tile_size)), 200)
 
 class Portal(pg.sprite.Sprite):
-    def __init__(self, x, y):
+    def __init__(self, x, y, animation):
         super(Portal, self).__init__()
-        log("Initializing Portal")
-        self.load_animations()
-        self.image = self.images[0]
-        self.mask = pg.mask.from_surface(self.image)
+        log("Initializing Portal", DEBUG)
+        self.animation = animation
+        self.mask = assets.mask(animation.animation.frames[0])
         self.rect = self.image.get_rect()
         self.rect.x = x
         self.rect.bottom = y
 
-        self.current_image = 0
-        self.timer = pg.time.get_ticks()
-        self.interval = 100
+    @property
+    def image(self):
+        return self.animation.image
 
-    def load_animations(self):
-        log("Loading Portal animations")
-        tile_size = 64
-        tile_scale = 2
-
-        self.images = []
-
-        num_images = 2
-        spritesheet = pg.image.load(
-            resource_path("Resources/sprites/greenportalspritesheet1.png")).convert_alpha()
-
-        for i in range(num_images):
-            x = i * tile_size
-            y = 0
-            rect = pg.Rect(x, y, tile_size, tile_size)
-            image = spritesheet.subsurface(rect)
-            image = pg.transform.scale(image, (tile_scale * tile_size, tile_scale * tile_size))
-            self.images.append(image)
-
-    def update(self):
-        if pg.time.get_ticks() - self.timer > self.interval:
-            self.current_image += 1
-            if self.current_image > len(self.images) - 1:
-                self.current_image = 0
-            self.image = self.images[self.current_image]
-            self.timer = pg.time.get_ticks()
+def load_portal_animation():
+    log("Loading Portal animations", DEBUG)
+    tile_size = 64
+    tile_scale = 2
 
-class Game:
-    def __init__(self):
-        log("Initializing Game")
-        self.screen = pg.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        pg.display.set_caption("Платформер-бойня")
-        self.clock = pg.time.Clock()
-        self.level = 1
-        self.allcoll_coins = 0
-        self.setup()
+    num_images = 2
+    return Animation(assets.strip(resource_path("Resources/sprites/greenportalspritesheet1.png"), num_images,
+                                  tile_size, tile_size, (tile_scale * tile_size, tile_scale * tile_size)), 100)
 
-    def setup(self):
-        log("Setting up game level")
-        self.mode = "game"
-        self.all_sprites = pg.sprite.Group()
+class Level:
+    """ Всё, что строится при загрузке уровня: карта, сетка тайлов, группы и спрайты """
+
+    def __init__(self, number, map_dir, streaming=None):
+        log(f"Loading level {number}")
+        self.number = number
+        self.map_dir = map_dir
+        self.all_sprites = SpatialGroup()
         self.collision = pg.sprite.Group()
         self.platrorms = pg.sprite.Group()
-        self.enemies = pg.sprite.Group()
         self.balls = pg.sprite.Group()
         self.coins = pg.sprite.Group()
         self.portals = pg.sprite.Group()
-        self.collected_coins = 0
-        self.is_running = False
-        self.camera_x = 0
-        self.camera_y = 0
-        self.camera_speed = 4
 
-        self.tmx_map = pytmx.load_pygame(resource_path(f"Resources/map/level{self.level}.tmx"))
+        self.data = load_level_data(self.map_dir, self.number, TILE_SCALE)
+        tile_width = self.data.tile_width
+        tile_height = self.data.tile_height
 
-        self.map_pixel_width = self.tmx_map.width * self.tmx_map.tilewidth * TILE_SCALE
-        self.map_pixel_height = self.tmx_map.height * self.tmx_map.tileheight * TILE_SCALE
+        self.map_pixel_width = self.data.width * tile_width * TILE_SCALE
+        self.map_pixel_height = self.data.height * tile_height * TILE_SCALE
+        self.tile_grid = TileGrid(self.data.width, self.data.height,
+                                  tile_width * TILE_SCALE, tile_height * TILE_SCALE, self.data.gids,
+                                  self.data.solid_rects, self.data.solid_ids)
+        log(f"Level {number}: {int((self.data.gids != 0).sum())} solid tiles merged into "
+            f"{len(self.data.solid_rects)} collision rects", DEBUG)
 
         self.player = Player(self.map_pixel_width, self.map_pixel_height)
         self.all_sprites.add(self.player)
 
-        for layer in self.tmx_map:
-            if layer.name == "Game":
-                for x, y, gid in layer:
-                    tile = self.tmx_map.get_tile_image_by_gid(gid)
-                    if tile:
-                        platform = Platform(tile, x * self.tmx_map.tilewidth, y * self.tmx_map.tileheight,
-                                            self.tmx_map.tilewidth, self.tmx_map.tileheight)
-                        self.all_sprites.add(platform)
-                        self.platrorms.add(platform)
-            elif layer.name == "Coins":
-                for x, y, gid in layer:
-                    tile = self.tmx_map.get_tile_image_by_gid(gid)
-                    if tile:
-                        coin = Coin(x * self.tmx_map.tilewidth * TILE_SCALE,
-                                    y * self.tmx_map.tileheight * TILE_SCALE)
-                        self.all_sprites.add(coin)
-                        self.coins.add(coin)
-                self.coins_amount = len(self.coins.sprites())
-            elif layer.name == "Portal":
-                for x, y, gid in layer:
-                    tile = self.tmx_map.get_tile_image_by_gid(gid)
-                    if tile:
-                        portal = Portal(x * self.tmx_map.tilewidth * TILE_SCALE,
-                                        y * self.tmx_map.tileheight * TILE_SCALE)
-                        self.all_sprites.add(portal)
-                        self.portals.add(portal)
-            elif layer.name == "Collision":
-                for x, y, gid in layer:
-                    tile = self.tmx_map.get_tile_image_by_gid(gid)
-                    if tile:
-                        platform = Platform(tile, x * self.tmx_map.tilewidth, y * self.tmx_map.tileheight,
-                                            self.tmx_map.tilewidth, self.tmx_map.tileheight)
-                        self.collision.add(platform)
-
-        with open(resource_path(f"Resources/map/level{self.level}_enemies.json"), "r") as json_file:
-            data = json.load(json_file)
-        for enemy in data["enemies"]:
-            if enemy["name"] == "Redic":
-                x1 = enemy["start_pos"][0] * TILE_SCALE * self.tmx_map.tilewidth
-                y1 = enemy["start_pos"][1] * TILE_SCALE * self.tmx_map.tilewidth
-                x2 = enemy["final_pos"][0] * TILE_SCALE * self.tmx_map.tilewidth
-                y2 = enemy["final_pos"][1] * TILE_SCALE * self.tmx_map.tilewidth
-
-                redic = Redic(self.map_pixel_width, self.map_pixel_height, [x1, y1], [x2, y2])
-                self.enemies.add(redic)
-                self.all_sprites.add(redic)
-            elif enemy["name"] == "Cheese":
-                x1 = enemy["start_pos"][0] * TILE_SCALE * self.tmx_map.tilewidth
-                y1 = enemy["start_pos"][1] * TILE_SCALE * self.tmx_map.tilewidth
-                x2 = enemy["final_pos"][0] * TILE_SCALE * self.tmx_map.tilewidth
-                y2 = enemy["final_pos"][1] * TILE_SCALE * self.tmx_map.tilewidth
-
-                cheese = Cheese(self.map_pixel_width, self.map_pixel_height, [x1, y1], [x2, y2])
-                self.enemies.add(cheese)
-                self.all_sprites.add(cheese)
-
-        self.run()
+        self.coins_amount = len(self.data.coins)
+        self.taken_coins = set()
+        self.coin_sprites = {}
+        self.animations = AnimationClock()
+        self.coin_animation = self.animations.group("coins", load_coin_animation())
+        self.portal_animation = self.animations.group("portals", load_portal_animation())
+        self.streamer = None
+        if streaming is None:
+            streaming = STREAM_LEVELS
+        if streaming:
+            self.streamer = ChunkStreamer(self.data.width, self.data.height, STREAM_CHUNK_TILES,
+                                          tile_width * TILE_SCALE, tile_height * TILE_SCALE,
+                                          self.load_region, self.unload_region, STREAM_RADIUS)
+            self.streamer.update(*self.player.rect.center)
+        else:
+            self.load_region((0, 0, self.data.width, self.data.height))
+
+        enemy_scale = TILE_SCALE * tile_width
+        self.enemies = EnemySwarm(load_enemy_kinds(), self.map_pixel_width, self.map_pixel_height, TILE_SCALE)
+        self.enemies.spawn(self.data.enemy_kinds, self.data.enemy_starts * enemy_scale,
+                           self.data.enemy_finals * enemy_scale)
+
+    def load_region(self, tile_range):
+        """ Создать спрайты тайлов, монет и порталов в прямоугольнике тайлов; вернуть их список """
+        x0, y0, x1, y1 = tile_range
+        tile_width = self.data.tile_width
+        tile_height = self.data.tile_height
+        sprites = []
+
+        for x, y, gid in self.data.tiles(self.data.collision_gids, x0, y0, x1, y1):
+            platform = Platform(self.data.tile_image(gid), x * tile_width, y * tile_height, tile_width, tile_height)
+            self.collision.add(platform)
+            sprites.append(platform)
+        for x, y, gid in self.data.tiles(self.data.gids, x0, y0, x1, y1):
+            platform = Platform(self.data.tile_image(gid), x * tile_width, y * tile_height, tile_width, tile_height)
+            self.platrorms.add(platform)
+            sprites.append(platform)
+
+        for index in self.data.points_in(self.data.coins, x0, y0, x1, y1):
+            if index in self.taken_coins:
+                continue
+            x, y = self.data.coins[index].tolist()
+            coin = Coin(x * tile_width * TILE_SCALE, y * tile_height * TILE_SCALE, self.coin_animation)
+            coin.index = index
+            self.coin_sprites[index] = coin
+            self.all_sprites.add(coin)
+            self.coins.add(coin)
+            sprites.append(coin)
+        for index in self.data.points_in(self.data.portals, x0, y0, x1, y1):
+            x, y = self.data.portals[index].tolist()
+            portal = Portal(x * tile_width * TILE_SCALE, y * tile_height * TILE_SCALE, self.portal_animation)
+            self.all_sprites.add(portal)
+            self.portals.add(portal)
+            sprites.append(portal)
+        return sprites
+
+    def unload_region(self, sprites):
+        for sprite in sprites:
+            sprite.kill()
+            if isinstance(sprite, Coin):
+                del self.coin_sprites[sprite.index]
+
+    def retime(self, now):
+        """ Перевести таймеры спрайтов на часы симуляции в момент запуска уровня """
+        self.player.damage_timer = now
+        self.player.timer = now
+        self.animations.retime(now)
+        self.enemies.retime(now)
+
+class Simulation:
+    """ Состояние мира и его шаг step(inputs, dt) без окна, клавиатуры и настенных часов.
+    При advance=False портал не грузит следующий уровень, а переводит мир в режим "completed" """
+
+    def __init__(self, level=1, map_dir=None, preload=False, advance=True):
+        log("Initializing Simulation")
+        self.level = level
+        self.advance = advance
+        self.map_dir = map_dir or resource_path("Resources/map")
+        self.loader = LevelLoader(Level, self.map_dir) if preload else None
+        self.allcoll_coins = 0
+        self.time = 0
+        self.ticks = 0
+        self.level_loads = 0
+        self.ball_pool = SpritePool(Ball, BALL_POOL_SIZE)
+        self.mask_tests = MaskTester()
+        self.setup()
+
+    def setup(self):
+        log("Setting up game level")
+        self.mode = "game"
+        self.collected_coins = 0
+        self.ball_pool.release_all()
+        if self.loader:
+            level = self.loader.get(self.level)
+        else:
+            level = Level(self.level, self.map_dir)
+        level.retime(self.time)
+        self.install(level)
+        self.start = self.snapshot()
+        if self.loader:
+            self.loader.preload(self.level + 1)
+
+    def snapshot(self):
+        """ Снимок изменяемого состояния текущего уровня для быстрого перезапуска и чекпоинтов """
+        return snapshot.capture(self)
+
+    def restore(self, world):
+        log("Restoring level state", DEBUG)
+        snapshot.restore(self, world)
+
+    def install(self, level):
+        self.level_data = level
+        self.map_pixel_width = level.map_pixel_width
+        self.map_pixel_height = level.map_pixel_height
+        self.tile_grid = level.tile_grid
+        self.all_sprites = level.all_sprites
+        self.collision = level.collision
+        self.platrorms = level.platrorms
+        self.enemies = level.enemies
+        self.balls = level.balls
+        self.coins = level.coins
+        self.portals = level.portals
+        self.player = level.player
+        self.coins_amount = level.coins_amount
+        self.taken_coins = level.taken_coins
+        self.streamer = level.streamer
+        self.animations = level.animations
+        self.level_loads += 1
+
+    def step(self, inputs, dt=TICK_MS):
+        """ Шаг мира на dt мс; скорости заданы на тик TICK_MS, поэтому при другом dt они масштабируются """
+        step = Step(dt / TICK_MS, self.ticks)
+        self.time += dt
+        self.ticks += 1
+        if self.mode == "game over":
+            if inputs.restart:
+                self.restore(self.start)
+            return
+        if self.mode != "game":
+            return
+
+        if inputs.fire:
+            ball = self.ball_pool.acquire()
+            ball.launch(self.player.rect, self.player.direction, self.time)
+            self.balls.add(ball)
+            self.all_sprites.add(ball)
+
+        if self.player.hp < 0:
+            self.mode = "game over"
+            return
+        self.mask_tests.reset()
+        candidates = self.enemies.candidates
+        with profiler.section("sim.player"):
+            for i in self.enemies.overlapping(self.player.rect):
+                if self.mask_tests(self.player, self.enemies.view(i)):
+                    self.player.get_damage(self.time)
+            self.mask_tests.candidates = self.enemies.candidates - candidates
+            self.player.update(self.tile_grid, inputs, self.time, step)
+        if self.streamer:
+            with profiler.section("sim.streaming"):
+                self.streamer.update(*self.player.rect.center)
+        with profiler.section("sim.enemies"):
+            self.enemies.update(self.tile_grid, self.time, step)
+        with profiler.section("sim.balls"):
+            self.balls.update(step)
+        with profiler.section("sim.animation"):
+            self.animations.tick(self.time)
+        with profiler.section("sim.pickups"):
+            hits = self.all_sprites.collide(self.player, self.coins, True)
+            for hit in hits:
+                self.taken_coins.add(hit.index)
+                self.collected_coins += 1
+                self.allcoll_coins += 1
+
+            hits = self.all_sprites.collide(self.player, self.portals, False, self.mask_tests)
+        if self.collected_coins > self.coins_amount / 2 and hits:
+            if not self.advance:
+                self.mode = "completed"
+                return
+            self.level += 1
+            if self.level == 4:
+                self.mode = "finished"
+                return
+            self.setup()
+            return
+
+        with profiler.section("sim.ball_hits"):
+            for ball in self.balls.sprites():
+                hits = self.enemies.overlapping(ball.rect)
+                if len(hits):
+                    ball.kill()
+                    self.enemies.kill(hits)
+                elif self.tile_grid.collides(ball.rect):
+                    ball.kill()
+            bounds = pg.Rect(0, 0, self.map_pixel_width, self.map_pixel_height)
+            self.ball_pool.collect(lambda ball: self.time - ball.launched > BALL_LIFETIME
+                                   or not bounds.colliderect(ball.rect))
+        self.all_sprites.moved([self.player, *self.balls])
+
+class Game:
+    def __init__(self, simulation=None, startup=None, pipeline=PIPELINE_RENDER,
+                 update_rate=UPDATE_RATE, render_rate=FPS, interpolate=INTERPOLATE):
+        log("Initializing Game")
+        self.startup = startup or StartupTimes()
+        init_display()
+        self.startup.mark("pygame init")
+        self.screen = pg.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        pg.display.set_caption("Платформер-бойня")
+        self.startup.mark("window")
+        self.background = load_background()
+        self.startup.mark("background")
+        self.clock = pg.time.Clock()
+        self.tick_ms = 1000 / update_rate
+        self.render_rate = render_rate
+        self.interpolate = interpolate
+        self.simulation = simulation or Simulation(preload=True)
+        self.startup.mark("level")
+        self.hud = Hud(pg.font.Font(None, 36), (SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.renderer = Renderer(self.screen, self.background, self.hud)
+        self.render_thread = None
+        if pipeline and sys.platform == "darwin":
+            # Cocoa выводит окно только из главного потока
+            log("Render thread is not supported on macOS, drawing on the main thread", WARNING)
+        elif pipeline:
+            self.render_thread = RenderThread(self.renderer)
+        self.profiler_overlay = ProfilerOverlay(profiler)
+        self.show_profile = False
+        # Включённый с запуска (PLATFORMER_PROFILE) профилировщик F3 не выключает
+        self.always_profile = profiler.enabled
+        self.record_path = os.environ.get("PLATFORMER_RECORD")
+        self.recorder = Recorder(self.simulation) if self.record_path else None
+        self.is_running = False
+        self.setup()
+        self.startup.mark("level view")
+
+    def setup(self):
+        log("Setting up level view")
+        sim = self.simulation
+        self.level_loads = sim.level_loads
+        self.camera_x = 0
+        self.camera_y = 0
+        self.sprites_drawn = 0
+        self.sprites_total = 0
+        self.camera_speed = 4
+        self.previous = {}
+        self.previous_enemies = None
+        self.previous_mode = None
+
+        self.static_layer = None
+        self.baked_chunks = set()
+        if BAKE_STATIC_LAYERS and sim.streamer:
+            self.static_layer = StaticLayer(sim.map_pixel_width, sim.map_pixel_height, sim.streamer.chunk_width)
+        elif BAKE_STATIC_LAYERS:
+            self.static_layer = StaticLayer(sim.map_pixel_width, sim.map_pixel_height)
+            self.static_layer.bake(list(sim.collision) + list(sim.platrorms))
+
+    def sync_streamed_chunks(self):
+        """ Допечь подгруженные чанки карты и забыть выгруженные """
+        streamer = self.simulation.streamer
+        for key in streamer.chunks.keys() - self.baked_chunks:
+            self.static_layer.bake([sprite for sprite in streamer.chunks[key] if isinstance(sprite, Platform)])
+            self.baked_chunks.add(key)
+        for key in self.baked_chunks - streamer.chunks.keys():
+            self.static_layer.drop(streamer.pixel_rect(key))
+            self.baked_chunks.discard(key)
 
     def run(self):
+        """ Симуляция идёт фиксированными шагами tick_ms по накопленному времени, кадры рисуются с частотой
+        render_rate между двумя последними шагами; за кадр догоняется не больше MAX_CATCH_UP шагов.
+        Скорости Simulation.step масштабирует под длину шага, так что частота шагов меняет точность, а не скорость игры """
         self.is_running = True
+        accumulator = 0.0
+        pending = Inputs()
+        last = time.perf_counter()
         while self.is_running:
-            self.event()
-            self.update()
-            self.draw()
-            self.clock.tick(60)
+            profiler.begin_frame()
+            now = time.perf_counter()
+            accumulator += (now - last) * 1000
+            last = now
+            with profiler.section("event"):
+                inputs = self.event()
+            # Нажатия клавиш приходят один раз: держим их до ближайшего шага и отдаём только ему
+            pending = Inputs(fire=pending.fire or inputs.fire, restart=pending.restart or inputs.restart)
+            with profiler.section("update"):
+                steps = 0
+                while accumulator >= self.tick_ms and steps < MAX_CATCH_UP and self.is_running:
+                    self.update(inputs._replace(fire=pending.fire, restart=pending.restart))
+                    pending = Inputs()
+                    accumulator -= self.tick_ms
+                    steps += 1
+                if accumulator >= self.tick_ms:
+                    # Не успеваем: остаток отставания выбрасываем, игра на мгновение замедляется
+                    accumulator %= self.tick_ms
+            with profiler.section("draw"):
+                self.draw(accumulator / self.tick_ms if self.interpolate else 1.0)
+            self.startup.finish("first frame")
+            if profiler.enabled:
+                profiler.count("sim_steps", steps)
+                self.count_frame()
+            profiler.end_frame()
+            self.clock.tick(self.render_rate)
+        self.close()
+        dump_path = os.environ.get("PLATFORMER_PROFILE_DUMP")
+        if dump_path and profiler.enabled:
+            profiler.dump(dump_path)
+            log(f"Profile written to {dump_path}")
+        if self.recorder:
+            self.recorder.save(self.record_path)
+            log(f"Session recorded to {self.record_path}")
         pg.quit()
         quit()
 
+    def close(self):
+        """ Дождаться потока отрисовки, если он есть """
+        if self.render_thread:
+            self.render_thread.stop()
+            self.render_thread = None
+
     def event(self):
+        fire = False
+        restart = False
         for event in pg.event.get():
             if event.type == pg.QUIT:
                 self.is_running = False
-            if event.type == pg.KEYDOWN:
+            if event.type == pg.KEYDOWN and event.key == pg.K_F3:
+                self.show_profile = not self.show_profile
+                profiler.enabled = self.always_profile or self.show_profile
+            elif event.type == pg.KEYDOWN:
+                restart = True
                 if event.key == pg.K_e:
-                    ball = Ball(self.player.rect, self.player.direction)
-                    self.balls.add(ball)
-                    self.all_sprites.add(self.balls)
-            if self.mode == "game over":
-                if event.type == pg.KEYDOWN:
-                    self.setup()
-
-    def update(self):
-        if self.player.hp < 0:
-            self.mode = "game over"
+                    fire = True
+        keys = pg.key.get_pressed()
+        return Inputs(keys[pg.K_a], keys[pg.K_d], keys[pg.K_SPACE], fire, restart)
+
+    def update(self, inputs):
+        sim = self.simulation
+        self.remember()
+        sim.step(inputs, self.tick_ms)
+        if self.recorder:
+            self.recorder.record(inputs, self.tick_ms)
+        if sim.mode == "finished":
+            self.is_running = False
             return
-        for enemy in self.enemies.sprites():
-            if pg.sprite.collide_mask(self.player, enemy):
-                self.player.get_damage()
-        self.player.update(self.platrorms)
-        for enemy in self.enemies.sprites():
-            enemy.update(self.platrorms)
-        self.balls.update()
-        for coin in self.coins.sprites():
-            coin.update()
-        for portal in self.portals.sprites():
-            portal.update()
-        hits = pg.sprite.spritecollide(self.player, self.coins, True)
-        for hit in hits:
-            self.collected_coins += 1
-            self.allcoll_coins += 1
-
-        hits = pg.sprite.spritecollide(self.player, self.portals, False, pg.sprite.collide_mask)
-        if self.collected_coins > self.coins_amount / 2:
-            for hit in hits:
-                self.level += 1
-                if self.level == 4:
-                    quit()
-                self.setup()
-
-        pg.sprite.groupcollide(self.balls, self.enemies, True, True)
-        pg.sprite.groupcollide(self.balls, self.platrorms, True, False)
-        self.camera_x = self.player.rect.x - SCREEN_WIDTH // 2
-        self.camera_y = self.player.rect.y - SCREEN_HEIGHT // 2
-
-        self.camera_x = max(0, min(self.camera_x, self.map_pixel_width - SCREEN_WIDTH))
-        self.camera_y = max(0, min(self.camera_y, self.map_pixel_height - SCREEN_HEIGHT))
-
-    def draw(self):
-        self.screen.blit(background, (0, 0))
-        for sprite in self.collision:
-            self.screen.blit(sprite.image, sprite.rect.move(-self.camera_x, -self.camera_y))
-        for sprite in self.all_sprites:
-            self.screen.blit(sprite.image, sprite.rect.move(-self.camera_x, -self.camera_y))
-        pg.draw.rect(self.screen, pg.Color("red"), (10, 10, self.player.hp * 10, 10))
-        pg.draw.rect(self.screen, pg.Color("black"), (10, 10, 100, 10), 1)
-        moneytext = font.render(f"{self.allcoll_coins}", True, (0, 0, 0))
-        moneytext_rect = moneytext.get_rect(center=(20, 40))
-        self.screen.blit(moneytext, moneytext_rect)
-
-        if self.mode == "game over":
-            text = font.render("Вы проиграли", True, (255, 0, 0))
-            text_rect = text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
-            self.screen.blit(text, text_rect)
-        pg.display.flip()
-
-def main():
+        if sim.level_loads != self.level_loads:
+            self.setup()
+        self.camera_x, self.camera_y = self.camera(sim.player.rect)
+
+    def remember(self):
+        """ Положения движущихся объектов до шага: кадр рисуется между ними и положениями после шага """
+        sim = self.simulation
+        self.previous_mode = sim.mode
+        self.previous = {sprite: sprite.rect.topleft for sprite in (sim.player, *sim.balls)}
+        self.previous_enemies = (sim.enemies.x.copy(), sim.enemies.y.copy())
+
+    def interpolated(self, rect, start, alpha):
+        """ rect, сдвинутый назад к положению start на долю шага 1 - alpha """
+        if start is None:
+            return rect
+        return rect.move(round((start[0] - rect.x) * (1 - alpha)), round((start[1] - rect.y) * (1 - alpha)))
+
+    def camera(self, player_rect):
+        sim = self.simulation
+        camera_x = player_rect.x - SCREEN_WIDTH // 2
+        camera_y = player_rect.y - SCREEN_HEIGHT // 2
+
+        camera_x = max(0, min(camera_x, sim.map_pixel_width - SCREEN_WIDTH))
+        camera_y = max(0, min(camera_y, sim.map_pixel_height - SCREEN_HEIGHT))
+        return camera_x, camera_y
+
+    def count_frame(self):
+        """ Счётчики кадра для профилировщика: обновлённые спрайты, проверки столкновений, блиты """
+        sim = self.simulation
+        profiler.count("sprites_updated", 1 + len(sim.enemies) + len(sim.balls) + len(sim.coins) + len(sim.portals))
+        profiler.count("enemy_candidates", sim.mask_tests.candidates)
+        profiler.count("collision_tests", sim.mask_tests.broadphase)
+        profiler.count("mask_tests", sim.mask_tests.narrowphase)
+        profiler.count("blits", self.sprites_drawn + (self.static_layer.blits if self.static_layer else 0))
+
+    def draw(self, alpha=1.0):
+        frame = self.render_list(alpha)
+        if self.render_thread and not self.render_thread.submit(frame):
+            log("Render thread stopped, drawing on the main thread", ERROR)
+            self.render_thread = None
+        if not self.render_thread:
+            self.renderer.draw(frame)
+
+    def render_list(self, alpha=1.0):
+        """ Снять с мира всё, что нужно для кадра: дальше кадр рисуется без обращений к симуляции.
+        alpha < 1 рисует движущиеся объекты между положениями до и после последнего шага """
+        sim = self.simulation
+        previous = self.previous if alpha < 1 and self.previous_mode == sim.mode else {}
+        enemy_start = None
+        if previous and self.previous_enemies is not None and len(self.previous_enemies[0]) == len(sim.enemies):
+            enemy_start = self.previous_enemies
+        camera_x, camera_y = self.camera_x, self.camera_y
+        if previous:
+            camera_x, camera_y = self.camera(self.interpolated(sim.player.rect, previous.get(sim.player), alpha))
+        view = pg.Rect(camera_x, camera_y, SCREEN_WIDTH, SCREEN_HEIGHT)
+        # Отсечение идёт по положениям после шага, поэтому при интерполяции берём запас по краям
+        query = view.inflate(128, 128) if previous else view
+        world = []
+        if self.static_layer:
+            if sim.streamer:
+                self.sync_streamed_chunks()
+            world.extend(self.static_layer.visible(view))
+        else:
+            for sprite in sim.collision:
+                world.append((sprite.image, sprite.rect.move(-camera_x, -camera_y)))
+            for sprite in sim.platrorms:
+                world.append((sprite.image, sprite.rect.move(-camera_x, -camera_y)))
+        visible = sim.all_sprites.visible(query)
+        enemies = sim.enemies.overlapping(query)
+        # Кадры лежат на страницах атласа: блиты с областями страниц вместо отдельного кадра на каждый спрайт
+        for sprite in visible:
+            page, area = assets.source(sprite.image)
+            rect = self.interpolated(sprite.rect, previous.get(sprite), alpha)
+            world.append((page, rect.move(-camera_x, -camera_y), area))
+        for i in enemies:
+            page, area = assets.source(sim.enemies.image(i))
+            rect = sim.enemies.rect(i)
+            if enemy_start is not None:
+                rect = self.interpolated(rect, (int(enemy_start[0][i]), int(enemy_start[1][i])), alpha)
+            world.append((page, rect.move(-camera_x, -camera_y), area))
+        self.sprites_drawn = len(visible) + len(enemies)
+        self.sprites_total = len(sim.all_sprites) + len(sim.enemies)
+
+        overlay = None
+        if self.show_profile:
+            surface = self.profiler_overlay.current()
+            overlay = (surface, (SCREEN_WIDTH - surface.get_width() - 10, 10))
+        message = "Вы проиграли" if sim.mode == "game over" else None
+        return RenderList(tuple(world), sim.player.hp, sim.allcoll_coins, message, sim.mode != "game", overlay)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Платформер-бойня")
+    parser.add_argument("--startup-times", action="store_true", help="напечатать время этапов запуска до первого кадра")
+    parser.add_argument("--pipeline", action="store_true", default=PIPELINE_RENDER,
+                        help="рисовать кадр в отдельном потоке, пока считается следующий")
+    parser.add_argument("--update-rate", type=int, default=UPDATE_RATE,
+                        help="шагов симуляции в секунду; скорость игры от неё не зависит, "
+                             "но ниже 60 длинные падения могут проскочить тонкие платформы")
+    parser.add_argument("--render-rate", type=int, default=FPS, help="предел кадров в секунду, 0 — без предела")
+    parser.add_argument("--no-interpolate", dest="interpolate", action="store_false", default=INTERPOLATE,
+                        help="рисовать последнее состояние симуляции без интерполяции")
+    args = parser.parse_args(argv)
+
+    log("Starting the game.")
     log("Entering main")
+    startup = StartupTimes(verbose=args.startup_times)
+    startup.add("import", IMPORT_TIME)
     try:
-        game = Game()
+        game = Game(startup=startup, pipeline=args.pipeline, update_rate=args.update_rate,
+                    render_rate=args.render_rate, interpolate=args.interpolate)
+        game.run()
     except Exception as e:
-        log(f"An error occurred: {e}")
-        log(traceback.format_exc())
+        log(f"An error occurred: {e}", ERROR)
+        log(traceback.format_exc(), ERROR)
         raise
     log("Game finished.")
 
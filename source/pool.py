@@ -0,0 +1,44 @@
+class SpritePool:
+    """ Пул спрайтов фиксированного размера: объекты не создаются заново, а возвращаются и выдаются снова """
+
+    def __init__(self, factory, capacity):
+        self.factory = factory
+        self.capacity = capacity
+        self.live = []
+        self.free = []
+        self.created = 0
+        self.high_water = 0
+
+    def acquire(self):
+        """ Свободный спрайт; если пул исчерпан, переиспользуется самый старый живой """
+        if self.free:
+            sprite = self.free.pop()
+        elif self.created < self.capacity:
+            sprite = self.factory()
+            self.created += 1
+        else:
+            sprite = self.live.pop(0)
+            sprite.kill()
+        self.live.append(sprite)
+        self.high_water = max(self.high_water, len(self.live))
+        return sprite
+
+    def collect(self, expired):
+        """ Вернуть в пул убитые спрайты и те, для которых expired(sprite) истинно """
+        still_live = []
+        for sprite in self.live:
+            if not sprite.alive() or expired(sprite):
+                sprite.kill()
+                self.free.append(sprite)
+            else:
+                still_live.append(sprite)
+        self.live = still_live
+
+    def release_all(self):
+        for sprite in self.live:
+            sprite.kill()
+        self.free.extend(self.live)
+        self.live = []
+
+    def stats(self):
+        return {"live": len(self.live), "free": len(self.free), "high_water": self.high_water}
@@ -0,0 +1,189 @@
+import contextlib
+import csv
+import json
+import os
+import time
+from collections import deque
+
+import pygame as pg
+
+from logger import DEBUG, log
+
+PROFILE_WINDOW = 300
+OVERLAY_REFRESH = 30
+NULL_SECTION = contextlib.nullcontext()
+
+
+class Section:
+    """ Замер одной фазы кадра: with profiler.section("draw"): ... """
+
+    __slots__ = ("profiler", "name", "started")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.add(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class Profiler:
+    """ Время фаз кадра в мс и счётчики; выключенный отдаёт пустой контекст и ничего не пишет """
+
+    def __init__(self, enabled=False, window=PROFILE_WINDOW, keep_samples=False):
+        self.enabled = enabled
+        self.keep_samples = keep_samples
+        self.history = deque(maxlen=window)
+        self.samples = []
+        self.sections = {}
+        self.frame = {}
+        self.frame_started = None
+        self.frames = 0
+
+    def section(self, name):
+        if not self.enabled:
+            return NULL_SECTION
+        section = self.sections.get(name)
+        if section is None:
+            section = self.sections[name] = Section(self, name)
+        return section
+
+    def add(self, name, seconds):
+        self.frame[name] = self.frame.get(name, 0.0) + seconds * 1000
+
+    def count(self, name, value=1):
+        if self.enabled:
+            self.frame[name] = self.frame.get(name, 0) + value
+
+    def begin_frame(self):
+        if self.enabled:
+            self.frame_started = time.perf_counter()
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        frame = self.frame
+        self.frame = {}
+        if self.frame_started is not None:
+            frame["frame"] = (time.perf_counter() - self.frame_started) * 1000
+            self.frame_started = None
+        frame["index"] = self.frames
+        self.frames += 1
+        self.history.append(frame)
+        if self.keep_samples:
+            self.samples.append(frame)
+
+    def percentiles(self):
+        """ {имя: (p50, p99)} по последним кадрам окна """
+        values = {}
+        for frame in self.history:
+            for name, value in frame.items():
+                if name != "index":
+                    values.setdefault(name, []).append(value)
+        result = {}
+        for name, samples in values.items():
+            samples.sort()
+            result[name] = (samples[len(samples) // 2], samples[min(len(samples) - 1, int(0.99 * len(samples)))])
+        return result
+
+    def summary(self):
+        return {name: {"p50": round(p50, 3), "p99": round(p99, 3)}
+                for name, (p50, p99) in sorted(self.percentiles().items())}
+
+    def dump(self, path):
+        """ Сохранить покадровые замеры в CSV или JSON, формат по расширению файла """
+        samples = self.samples if self.keep_samples else list(self.history)
+        if os.path.splitext(path)[1].lower() == ".json":
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"frames": samples, "summary": self.summary()}, f, indent=2)
+            return
+        columns = ["index"] + sorted({name for frame in samples for name in frame} - {"index"})
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, columns)
+            writer.writeheader()
+            writer.writerows(samples)
+
+    def reset(self):
+        self.history.clear()
+        self.samples.clear()
+        self.frame = {}
+        self.frame_started = None
+        self.frames = 0
+
+
+class ProfilerOverlay:
+    """ Табличка p50/p99 поверх кадра, перерисовывается раз в OVERLAY_REFRESH кадров """
+
+    def __init__(self, profiler, font_size=20):
+        self.profiler = profiler
+        self.font_size = font_size
+        self.font = None
+        self.surface = None
+        self.rendered_at = None
+
+    def render(self):
+        if self.font is None:
+            self.font = pg.font.Font(None, self.font_size)
+        lines = [f"{'phase':<22}{'p50':>8}{'p99':>8}"]
+        for name, (p50, p99) in sorted(self.profiler.percentiles().items()):
+            lines.append(f"{name:<22}{p50:>8.2f}{p99:>8.2f}")
+        rows = [self.font.render(line, True, (255, 255, 255)) for line in lines]
+        width = max(row.get_width() for row in rows) + 8
+        height = sum(row.get_height() for row in rows) + 8
+        self.surface = pg.Surface((width, height), pg.SRCALPHA)
+        self.surface.fill((0, 0, 0, 160))
+        y = 4
+        for row in rows:
+            self.surface.blit(row, (4, y))
+            y += row.get_height()
+
+    def current(self):
+        """ Табличка на этот кадр; новая поверхность создаётся при перерисовке, старая не меняется """
+        frames = self.profiler.frames
+        if self.surface is None or frames - self.rendered_at >= OVERLAY_REFRESH:
+            self.render()
+            self.rendered_at = frames
+        return self.surface
+
+
+class StartupTimes:
+    """ Время этапов запуска до первого кадра; печатается при verbose, в лог пишется всегда """
+
+    def __init__(self, verbose=False):
+        self.verbose = verbose
+        self.phases = []
+        self.last = time.perf_counter()
+        self.finished = False
+
+    def add(self, phase, seconds):
+        self.phases.append((phase, seconds))
+
+    def mark(self, phase):
+        """ Закрыть этап phase: от прошлой отметки до сейчас """
+        now = time.perf_counter()
+        self.add(phase, now - self.last)
+        self.last = now
+
+    def report(self):
+        lines = [f"{phase:<14}{seconds * 1000:>9.1f} ms" for phase, seconds in self.phases]
+        lines.append(f"{'total':<14}{sum(seconds for _, seconds in self.phases) * 1000:>9.1f} ms")
+        return "\n".join(lines)
+
+    def finish(self, phase):
+        if self.finished:
+            return
+        self.mark(phase)
+        self.finished = True
+        log(f"Startup times:\n{self.report()}", DEBUG)
+        if self.verbose:
+            print(self.report())
+
+
+profiler = Profiler(enabled=bool(os.environ.get("PLATFORMER_PROFILE")),
+                    keep_samples=bool(os.environ.get("PLATFORMER_PROFILE_DUMP")))
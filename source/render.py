@@ -0,0 +1,105 @@
+import itertools
+
+import pygame as pg
+
+from spatial import SpatialHash
+
+CHUNK_SIZE = 512
+
+
+class StaticLayer:
+    """ Неподвижные тайлы уровня, запечённые в крупные куски CHUNK_SIZE x CHUNK_SIZE """
+
+    def __init__(self, width, height, chunk_size=CHUNK_SIZE):
+        self.width = width
+        self.height = height
+        self.chunk_size = chunk_size
+        self.chunks = {}
+        self.blits = 0
+
+    def chunk_range(self, rect):
+        x0 = max(0, rect.left // self.chunk_size)
+        y0 = max(0, rect.top // self.chunk_size)
+        x1 = (min(rect.right, self.width) - 1) // self.chunk_size
+        y1 = (min(rect.bottom, self.height) - 1) // self.chunk_size
+        return x0, y0, x1, y1
+
+    def chunk_surface(self, cx, cy):
+        if (cx, cy) not in self.chunks:
+            width = min(self.chunk_size, self.width - cx * self.chunk_size)
+            height = min(self.chunk_size, self.height - cy * self.chunk_size)
+            self.chunks[(cx, cy)] = pg.Surface((width, height), pg.SRCALPHA)
+        return self.chunks[(cx, cy)]
+
+    def bake(self, sprites):
+        touched = set()
+        for sprite in sprites:
+            x0, y0, x1, y1 = self.chunk_range(sprite.rect)
+            for cy in range(y0, y1 + 1):
+                for cx in range(x0, x1 + 1):
+                    chunk = self.chunk_surface(cx, cy)
+                    if (cx, cy) not in touched:
+                        # Печём в новую копию: уже отданный на отрисовку кусок не меняется под потоком отрисовки
+                        chunk = self.chunks[(cx, cy)] = chunk.convert_alpha()
+                        touched.add((cx, cy))
+                    chunk.blit(sprite.image, sprite.rect.move(-cx * self.chunk_size, -cy * self.chunk_size))
+
+    def drop(self, rect):
+        """ Забыть куски внутри rect, например при выгрузке чанка карты """
+        x0, y0, x1, y1 = self.chunk_range(pg.Rect(rect))
+        for cy in range(y0, y1 + 1):
+            for cx in range(x0, x1 + 1):
+                self.chunks.pop((cx, cy), None)
+
+    def visible(self, view):
+        """ Блиты (кусок, позиция на экране) для куска карты под view """
+        x0, y0, x1, y1 = self.chunk_range(view)
+        blits = []
+        for cy in range(y0, y1 + 1):
+            for cx in range(x0, x1 + 1):
+                chunk = self.chunks.get((cx, cy))
+                if chunk is not None:
+                    blits.append((chunk, (cx * self.chunk_size - view.x, cy * self.chunk_size - view.y)))
+        self.blits = len(blits)
+        return blits
+
+
+class SpatialGroup(pg.sprite.Group):
+    """ Группа спрайтов с пространственным индексом для отсечения по камере """
+
+    def __init__(self, *sprites, cell_size=256):
+        self.index = SpatialHash(cell_size)
+        self.order = {}
+        self.counter = itertools.count()
+        super(SpatialGroup, self).__init__(*sprites)
+
+    def add_internal(self, sprite, layer=None):
+        super(SpatialGroup, self).add_internal(sprite, layer)
+        self.order[sprite] = next(self.counter)
+        self.index.insert(sprite)
+
+    def remove_internal(self, sprite):
+        super(SpatialGroup, self).remove_internal(sprite)
+        del self.order[sprite]
+        self.index.remove(sprite)
+
+    def moved(self, sprites):
+        for sprite in sprites:
+            if sprite in self.index:
+                self.index.move(sprite)
+
+    def collide(self, sprite, group, dokill=False, collided=None):
+        """ Как pg.sprite.spritecollide, но кандидаты берутся из ячеек индекса, а не перебором всей группы """
+        hits = [other for other in self.index.query(sprite.rect) if other in group
+                and (collided(sprite, other) if collided else sprite.rect.colliderect(other.rect))]
+        hits.sort(key=self.order.__getitem__)
+        if dokill:
+            for other in hits:
+                other.kill()
+        return hits
+
+    def visible(self, view):
+        """ Спрайты, пересекающие view, в порядке добавления в группу """
+        found = [sprite for sprite in self.index.query(view) if sprite.rect.colliderect(view)]
+        found.sort(key=self.order.__getitem__)
+        return found
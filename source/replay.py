@@ -0,0 +1,144 @@
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+
+MAGIC = b"PLREPLAY"
+REPLAY_VERSION = 1
+CHECKPOINT_EVERY = 300
+BUTTONS = ("left", "right", "jump", "fire", "restart")
+
+
+def pack_inputs(inputs):
+    """ Кнопки тика одним байтом: бит на каждое поле Inputs """
+    return sum(1 << bit for bit, name in enumerate(BUTTONS) if getattr(inputs, name))
+
+
+def unpack_inputs(value, inputs_type):
+    return inputs_type(*(bool(value & (1 << bit)) for bit in range(len(BUTTONS))))
+
+
+def state_hash(simulation):
+    """ Короткий хэш изменяемого состояния мира для сверки записи и повтора """
+    sim = simulation
+    digest = hashlib.sha1()
+    digest.update(repr((sim.level, sim.mode, sim.ticks, sim.collected_coins, sim.allcoll_coins,
+                        tuple(sim.player.rect), sim.player.velocity_x, sim.player.velocity_y, sim.player.hp,
+                        sorted(sim.taken_coins), sorted(tuple(ball.rect) for ball in sim.balls))).encode())
+    for name in ("x", "y", "vy", "direction"):
+        digest.update(getattr(sim.enemies, name).tobytes())
+    return digest.hexdigest()[:16]
+
+
+class Recorder:
+    """ Запись сессии: уровень, кнопки каждого тика и хэши состояния на контрольных точках """
+
+    def __init__(self, simulation, checkpoint_every=CHECKPOINT_EVERY):
+        self.simulation = simulation
+        self.checkpoint_every = checkpoint_every
+        self.level = simulation.level
+        self.tick_ms = None
+        self.inputs = bytearray()
+        self.checkpoints = {}
+
+    def record(self, inputs, dt):
+        """ Вызывается после simulation.step(inputs, dt) """
+        self.tick_ms = dt if self.tick_ms is None else self.tick_ms
+        self.inputs.append(pack_inputs(inputs))
+        if len(self.inputs) % self.checkpoint_every == 0:
+            self.checkpoints[len(self.inputs)] = state_hash(self.simulation)
+
+    def save(self, path):
+        self.checkpoints[len(self.inputs)] = state_hash(self.simulation)
+        header = json.dumps({
+            "version": REPLAY_VERSION,
+            "level": self.level,
+            "tick_ms": self.tick_ms,
+            "ticks": len(self.inputs),
+            "checkpoints": {str(tick): digest for tick, digest in sorted(self.checkpoints.items())},
+        }).encode()
+        with open(path, "wb") as f:
+            f.write(MAGIC + struct.pack("<I", len(header)) + header)
+            f.write(zlib.compress(bytes(self.inputs), 9))
+
+
+def load(path):
+    """ Прочитать запись: (заголовок, байты кнопок по тикам) """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a replay")
+        header_length = struct.unpack("<I", f.read(4))[0]
+        header = json.loads(f.read(header_length))
+        inputs = zlib.decompress(f.read())
+    if header["version"] != REPLAY_VERSION:
+        raise ValueError(f"Unsupported replay version {header['version']}")
+    header["checkpoints"] = {int(tick): digest for tick, digest in header["checkpoints"].items()}
+    return header, inputs
+
+
+def replay(path, map_dir=None, verify=True):
+    """ Прогнать запись без окна и задержек, сверяя хэши; вернуть отчёт """
+    import platformer_beta as game
+
+    header, inputs = load(path)
+    started = time.perf_counter()
+    simulation = game.Simulation(level=header["level"], map_dir=map_dir)
+    load_time = time.perf_counter() - started
+    tick_ms = header["tick_ms"] or game.TICK_MS
+    checkpoints = header["checkpoints"] if verify else {}
+    mismatches = []
+
+    started = time.perf_counter()
+    for tick, value in enumerate(inputs, 1):
+        simulation.step(unpack_inputs(value, game.Inputs), tick_ms)
+        expected = checkpoints.get(tick)
+        if expected is not None:
+            actual = state_hash(simulation)
+            if actual != expected:
+                mismatches.append({"tick": tick, "expected": expected, "actual": actual})
+    total = time.perf_counter() - started
+
+    return {
+        "replay": os.path.basename(path),
+        "level": header["level"],
+        "ticks": len(inputs),
+        "checkpoints": len(checkpoints),
+        "mismatches": mismatches,
+        "level_load_ms": round(load_time * 1000, 3),
+        "seconds": round(total, 4),
+        "ticks_per_sec": round(len(inputs) / total, 2) if total else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Повтор записанных сессий как регрессионного бенчмарка")
+    parser.add_argument("replays", nargs="+", help="файлы записей (PLATFORMER_RECORD=путь при игре)")
+    parser.add_argument("--map-dir", help="каталог с картами вместо Resources/map")
+    parser.add_argument("--no-verify", action="store_true", help="не сверять хэши состояния")
+    parser.add_argument("--output", help="файл для JSON-отчёта, по умолчанию stdout")
+    args = parser.parse_args()
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    paths = [os.path.abspath(path) for path in args.replays]
+    map_dir = args.map_dir and os.path.abspath(args.map_dir)
+    output = args.output and os.path.abspath(args.output)
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    reports = [replay(path, map_dir, not args.no_verify) for path in paths]
+    text = json.dumps({"replays": reports}, indent=2)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if any(report["mismatches"] for report in reports):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import json
+
+import numpy as np
+
+PLAYER_FIELDS = ("velocity_x", "velocity_y", "is_jumping", "hp", "direction", "current_image")
+PLAYER_ANIMATIONS = ("idle_animation_right", "idle_animation_left", "run_animation_right", "run_animation_left")
+
+
+class WorldSnapshot:
+    """ Изменяемое состояние уровня: игрок, враги, монеты, таймеры. Карта, тайлы и картинки сюда не входят,
+    таймеры хранятся как возраст относительно момента снимка """
+
+    def __init__(self, level, mode, collected_coins, player, enemies, taken_coins, animations):
+        self.level = level
+        self.mode = mode
+        self.collected_coins = collected_coins
+        self.player = player
+        self.enemies = enemies
+        self.taken_coins = taken_coins
+        self.animations = animations
+
+    def save(self, path):
+        """ Скалярная часть в JSON, массивы врагов рядом в том же .npz """
+        meta = {"level": self.level, "mode": self.mode, "collected_coins": self.collected_coins,
+                "player": self.player, "taken_coins": self.taken_coins,
+                "animations": {name: list(phase) for name, phase in self.animations.items()}}
+        with open(path, "wb") as f:
+            np.savez(f, meta=np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8),
+                     **{f"enemy_{name}": array for name, array in self.enemies.items()})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(data["meta"].tobytes())
+            enemies = {name[len("enemy_"):]: data[name] for name in data.files if name.startswith("enemy_")}
+        animations = {name: tuple(phase) for name, phase in meta["animations"].items()}
+        return cls(meta["level"], meta["mode"], meta["collected_coins"], meta["player"], enemies,
+                   meta["taken_coins"], animations)
+
+
+def capture(simulation):
+    """ Снять состояние мира; снаряды в полёте не сохраняются """
+    sim = simulation
+    now = sim.time
+    player = sim.player
+    state = {name: getattr(player, name) for name in PLAYER_FIELDS}
+    state["rect"] = list(player.rect)
+    state["animation"] = next(name for name in PLAYER_ANIMATIONS
+                              if getattr(player, name) is player.current_animation)
+    state["timer_age"] = now - player.timer
+    state["damage_age"] = now - player.damage_timer
+
+    animations = sim.animations.phases(now)
+    enemies = {name: getattr(sim.enemies, name).copy() for name in sim.enemies.FIELDS}
+    enemies["timer"] = now - enemies["timer"]
+    return WorldSnapshot(sim.level, sim.mode, sim.collected_coins, state, enemies,
+                         sorted(sim.taken_coins), animations)
+
+
+def restore(simulation, snapshot):
+    """ Вернуть мир к снимку того же уровня, не пересоздавая карту, спрайты и картинки """
+    sim = simulation
+    if snapshot.level != sim.level:
+        raise ValueError(f"Snapshot of level {snapshot.level} cannot be restored on level {sim.level}")
+    now = sim.time
+    sim.mode = snapshot.mode
+    sim.collected_coins = snapshot.collected_coins
+    sim.ball_pool.release_all()
+
+    player = sim.player
+    state = snapshot.player
+    for name in PLAYER_FIELDS:
+        setattr(player, name, state[name])
+    player.rect.update(state["rect"])
+    player.current_animation = getattr(player, state["animation"])
+    player.image = player.current_animation[player.current_image]
+    player.timer = now - state["timer_age"]
+    player.damage_timer = now - state["damage_age"]
+
+    enemies = sim.enemies
+    for name in enemies.FIELDS:
+        setattr(enemies, name, snapshot.enemies[name].copy())
+    enemies.timer = now - enemies.timer
+    enemies.indexed = False
+
+    level = sim.level_data
+    sim.taken_coins.clear()
+    sim.taken_coins.update(snapshot.taken_coins)
+    if sim.streamer:
+        # Подгруженные чанки пересоздадутся вокруг игрока уже с восстановленным списком взятых монет
+        sim.streamer.unload_all()
+    for index, coin in level.coin_sprites.items():
+        if index in sim.taken_coins:
+            coin.kill()
+            continue
+        if not coin.alive():
+            sim.coins.add(coin)
+            sim.all_sprites.add(coin)
+    sim.animations.restore(snapshot.animations, now)
+
+    sim.all_sprites.moved([player])
+    if sim.streamer:
+        sim.streamer.update(*player.rect.center)
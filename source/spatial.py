@@ -0,0 +1,53 @@
+class SpatialHash:
+    """ Равномерная сетка ячеек cell_size x cell_size: объект лежит во всех ячейках, которые задевает его rect """
+
+    def __init__(self, cell_size=128):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.ranges = {}
+
+    def __len__(self):
+        return len(self.ranges)
+
+    def __contains__(self, item):
+        return item in self.ranges
+
+    def cell_range(self, rect):
+        return (rect.left // self.cell_size, rect.top // self.cell_size,
+                (rect.right - 1) // self.cell_size, (rect.bottom - 1) // self.cell_size)
+
+    def insert(self, item):
+        cell_range = self.cell_range(item.rect)
+        self.ranges[item] = cell_range
+        x0, y0, x1, y1 = cell_range
+        for cy in range(y0, y1 + 1):
+            for cx in range(x0, x1 + 1):
+                self.cells.setdefault((cx, cy), set()).add(item)
+
+    def remove(self, item):
+        cell_range = self.ranges.pop(item, None)
+        if cell_range is None:
+            return
+        x0, y0, x1, y1 = cell_range
+        for cy in range(y0, y1 + 1):
+            for cx in range(x0, x1 + 1):
+                cell = self.cells[(cx, cy)]
+                cell.discard(item)
+                if not cell:
+                    del self.cells[(cx, cy)]
+
+    def move(self, item):
+        """ Переиндексировать объект, только если он перешёл в другие ячейки """
+        if self.ranges.get(item) != self.cell_range(item.rect):
+            self.remove(item)
+            self.insert(item)
+
+    def query(self, rect):
+        found = set()
+        x0, y0, x1, y1 = self.cell_range(rect)
+        for cy in range(y0, y1 + 1):
+            for cx in range(x0, x1 + 1):
+                cell = self.cells.get((cx, cy))
+                if cell:
+                    found.update(cell)
+        return found
@@ -0,0 +1,45 @@
+class ChunkStreamer:
+    """ Держит загруженными только чанки карты в радиусе от точки интереса (обычно игрока) """
+
+    def __init__(self, width, height, chunk_tiles, tile_width, tile_height, load, unload, radius=1):
+        self.width = width
+        self.height = height
+        self.chunk_tiles = chunk_tiles
+        self.chunk_width = chunk_tiles * tile_width
+        self.chunk_height = chunk_tiles * tile_height
+        self.load = load
+        self.unload = unload
+        self.radius = radius
+        self.columns = -(-width // chunk_tiles)
+        self.rows = -(-height // chunk_tiles)
+        self.chunks = {}
+        self.loads = 0
+        self.unloads = 0
+
+    def tile_range(self, key):
+        cx, cy = key
+        x0 = cx * self.chunk_tiles
+        y0 = cy * self.chunk_tiles
+        return x0, y0, min(x0 + self.chunk_tiles, self.width), min(y0 + self.chunk_tiles, self.height)
+
+    def pixel_rect(self, key):
+        cx, cy = key
+        return cx * self.chunk_width, cy * self.chunk_height, self.chunk_width, self.chunk_height
+
+    def update(self, x, y):
+        """ Подгрузить чанки в радиусе radius от точки (x, y) и выгрузить те, что дальше radius + 1 """
+        cx = x // self.chunk_width
+        cy = y // self.chunk_height
+        for ky in range(max(0, cy - self.radius), min(self.rows, cy + self.radius + 1)):
+            for kx in range(max(0, cx - self.radius), min(self.columns, cx + self.radius + 1)):
+                if (kx, ky) not in self.chunks:
+                    self.chunks[(kx, ky)] = self.load(self.tile_range((kx, ky)))
+                    self.loads += 1
+        for key in list(self.chunks):
+            if max(abs(key[0] - cx), abs(key[1] - cy)) > self.radius + 1:
+                self.unload(self.chunks.pop(key))
+                self.unloads += 1
+
+    def unload_all(self):
+        for key in list(self.chunks):
+            self.unload(self.chunks.pop(key))